@@ -0,0 +1,114 @@
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.95
+DEFAULT_TTL = 6 * 60 * 60
+DEFAULT_MAX_ENTRIES = 1000
+FREE = -1
+
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(vector)) or 1.0
+    return vector / norm
+
+
+class SemanticAnswerCache:
+    """Answer cache keyed on question embeddings.
+
+    A lookup hits when a cached question in the same scope (the destination
+    and spot-content / index version) has cosine similarity of at least
+    `threshold`. Normalized question vectors live in one preallocated NumPy
+    matrix, so a lookup is a single matrix-vector product. Entries expire
+    after `ttl` seconds and the least recently used ones are replaced beyond
+    `max_entries`.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._vectors = None  # (max_entries, dim) float32, allocated on the first store
+        self._scopes = np.full(max_entries, FREE, dtype=np.int64)
+        self._created = np.zeros(max_entries)
+        self._used = np.zeros(max_entries, dtype=np.int64)
+        self._questions = [None] * max_entries
+        self._answers = [None] * max_entries
+        self._scope_codes = {}
+        self._clock = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _expire(self, now):
+        expired = (self._scopes != FREE) & (now - self._created > self.ttl)
+        for slot in np.flatnonzero(expired):
+            self._release(slot)
+
+    def _release(self, slot):
+        self._scopes[slot] = FREE
+        self._questions[slot] = self._answers[slot] = None
+
+    def lookup(self, vector, scope):
+        """Return the cached answer for the most similar question, or None"""
+        vector = _normalize(vector)
+        with self._lock:
+            code = self._scope_codes.get(scope)
+            if code is None or self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self.misses += 1
+                return None
+            self._expire(time.monotonic())
+            scores = self._vectors @ vector
+            scores[self._scopes != code] = -np.inf
+            slot = int(np.argmax(scores))
+            if scores[slot] < self.threshold:
+                self.misses += 1
+                return None
+            self._clock += 1
+            self._used[slot] = self._clock
+            self.hits += 1
+            return self._answers[slot]
+
+    def store(self, vector, scope, question, answer):
+        vector = _normalize(vector)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                # First entry, or the embedding model changed: start over.
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self._scopes[:] = FREE
+                self._scope_codes = {}
+            self._expire(time.monotonic())
+            code = self._scope_codes.get(scope)
+            if code is None:
+                # Forget scopes (old index versions) that no longer have entries.
+                live = set(np.unique(self._scopes).tolist())
+                self._scope_codes = {s: c for s, c in self._scope_codes.items() if c in live}
+                code = self._scope_codes[scope] = max(self._scope_codes.values(), default=-1) + 1
+            free = np.flatnonzero(self._scopes == FREE)
+            slot = int(free[0]) if free.size else int(np.argmin(self._used))
+            self._clock += 1
+            self._vectors[slot] = vector
+            self._scopes[slot] = code
+            self._created[slot] = time.monotonic()
+            self._used[slot] = self._clock
+            self._questions[slot] = question
+            self._answers[slot] = answer
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': int((self._scopes != FREE).sum()),
+        }
+
+
+def replay(answer, chunk_words=8):
+    """Yield a cached answer in word chunks, shaped like a streamed response"""
+    words = answer.split(' ')
+    for start in range(0, len(words), chunk_words):
+        chunk = ' '.join(words[start:start + chunk_words])
+        yield chunk if start + chunk_words >= len(words) else chunk + ' '
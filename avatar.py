@@ -0,0 +1,42 @@
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+import images
+import utils
+
+AVATAR_IMAGES = {"idle": "idle.png", "thinking": "thinking.png", "speaking": "speaking.png"}
+AVATAR_SETTLE_SECONDS = 2
+
+_avatar_component = components.declare_component(
+    "iki_avatar", path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "avatar_component")
+)
+
+
+@st.cache_data
+def avatar_image_urls():
+    """URLs for every avatar state; static derivatives when available, else inline base64"""
+    urls = {}
+    for state, path in AVATAR_IMAGES.items():
+        url = images.image_url(path, 'thumb', absolute=True)
+        if url is None:
+            url = f"data:image/png;base64,{utils.get_base64_of_bin_file(path)}"
+        urls[state] = url
+    return urls
+
+def guide_avatar(state="idle", key="guide_avatar"):
+    """Render the guide avatar once per run.
+
+    The component preloads all three poses and switches between them in the
+    browser by watching the sidebar (spinner, streaming answer), so the chat
+    loop never has to send avatar images. `state` is only used before the
+    component can see the sidebar.
+    """
+    return _avatar_component(
+        images=avatar_image_urls(),
+        state=state,
+        settle_after=AVATAR_SETTLE_SECONDS,
+        key=key,
+        default=None,
+    )
@@ -0,0 +1,241 @@
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthdata import generate_spots, LAT_RANGE, LON_RANGE
+from spotstore import SpotStore, SpotRepository
+from search import BM25Index, HybridRetriever, SpotSearchIndex
+from mapview import MAX_VIEWPORT_MARKERS, VIEWPORT_MARKER_THRESHOLD, build_spots_map, viewport_layer
+from geo import SpatialIndex, bbox_around
+from spotindex import sync_vector_store, load_langchain
+from embedcache import HashEmbeddings
+from ragpipeline import RagPipeline
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BASE_DIR, 'benchmark_results')
+DEFAULT_SIZES = [1000, 10000]
+QUERIES = ['torii gates shrine', 'sunset viewpoint', 'hot spring', 'what is the history of the bridge']
+REGRESSION_RATIO = 1.2
+ISLAND_VIEW = (LAT_RANGE[0], LON_RANGE[0], LAT_RANGE[1], LON_RANGE[1])
+NEARBY_VIEW_KM = 5
+
+
+class FakeStreamingLLM:
+    """Offline chat model stand-in that streams a fixed answer with a set delay per chunk"""
+
+    def __init__(self, answer="Kojima Shrine is best visited at low tide.", chunk_delay_ms=1.0):
+        self.answer = answer
+        self.chunk_delay_ms = chunk_delay_ms
+
+    def invoke(self, prompt):
+        return self.answer
+
+    def stream(self, prompt):
+        for word in self.answer.split(' '):
+            time.sleep(self.chunk_delay_ms / 1000)
+            yield word + ' '
+
+
+def measure(fn, repeat=5):
+    """Run `fn` `repeat` times; returns timing stats in ms and the last result"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {
+        'runs': repeat,
+        'min_ms': round(min(samples), 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+    }, result
+
+def _once(fn):
+    stats, result = measure(fn, repeat=1)
+    return stats, result
+
+
+def bench_store(spots, workdir, repeat):
+    """Import, reload and review writes through the SQLite spot store"""
+    json_path = os.path.join(workdir, 'spots.json')
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(spots, f, ensure_ascii=False)
+    db_path = os.path.join(workdir, 'spots.db')
+    results = {}
+    results['import_json'], store = _once(lambda: SpotStore(db_path, json_path))
+    repository = SpotRepository(store)
+    results['load_spots'], _ = measure(store.load_spots, repeat)
+    results['snapshot_cold'], catalog = _once(repository.snapshot)
+    results['snapshot_warm'], _ = measure(repository.snapshot, repeat)
+    spot_ids = [s['id'] for s in spots[:: max(1, len(spots) // 50)]]
+    counter = iter(range(10 ** 9))
+    results['add_review'], _ = measure(
+        lambda: store.add_review(spot_ids[next(counter) % len(spot_ids)], "Benchmark review"), max(repeat, 20)
+    )
+    results['snapshot_after_review'], catalog = _once(repository.snapshot)
+    return results, catalog
+
+def bench_filtering(catalog, repeat):
+    """The faceted search index the page filters and searches with"""
+    results = {}
+    results['search_index_build'], index = _once(lambda: _built(SpotSearchIndex(), catalog.spots))
+    results['search_index_sync_unchanged'], _ = measure(lambda: index.sync(catalog.spots), repeat)
+    results['category_filter'], _ = measure(
+        lambda: [index.search('', {'category': [c] if c != 'All' else []}) for c in ['All'] + catalog.categories],
+        repeat,
+    )
+    results['search_query'], _ = measure(lambda: [index.search(q) for q in QUERIES], repeat)
+    results['search_as_you_type'], _ = measure(lambda: [index.search('shrine'[:n]) for n in range(1, 7)], repeat)
+    results['search_facets'], _ = measure(
+        lambda: index.search('shrine', {'month': ['July'], 'duration': ['1-2 hours']}), repeat
+    )
+    return results
+
+def _built(index, spots):
+    index.sync(spots)
+    return index
+
+def bench_map(catalog, repeat):
+    """The map as the page draws it: every marker up to VIEWPORT_MARKER_THRESHOLD spots, else the ones in view"""
+    results = {}
+    if len(catalog.spots) <= VIEWPORT_MARKER_THRESHOLD:
+        results['map_build'], spots_map = measure(lambda: build_spots_map(catalog.spots), repeat)
+        # Each run renders its own copy of the cached map, i.e. what st_folium receives.
+        results['map_copy_and_render'], _ = measure(lambda: copy.deepcopy(spots_map).get_root().render(), repeat)
+        results['spatial_index_build'], spatial = _once(lambda: SpatialIndex(catalog.spots))
+    else:
+        results['map_build'], spots_map = measure(lambda: build_spots_map(catalog.spots, include_markers=False), repeat)
+        results['map_copy'], _ = measure(lambda: copy.deepcopy(spots_map), repeat)
+        results['spatial_index_build'], spatial = _once(lambda: SpatialIndex(catalog.spots))
+        origin = spatial.spots[0]['coordinates']
+        nearby_view = bbox_around(origin[0], origin[1], NEARBY_VIEW_KM)
+        results['viewport_layer'], _ = measure(
+            lambda: viewport_layer(spatial.sample_bbox(*nearby_view, MAX_VIEWPORT_MARKERS)[0]), repeat
+        )
+        results['viewport_layer_whole_island'], _ = measure(
+            lambda: viewport_layer(spatial.sample_bbox(*ISLAND_VIEW, MAX_VIEWPORT_MARKERS)[0]), repeat
+        )
+    results['nearby_query'], _ = measure(
+        lambda: [spatial.near_spot(s['id'], 5, limit=3) for s in catalog.spots[:12]], repeat
+    )
+    return results
+
+def bench_retrieval(catalog, workdir, repeat):
+    """Vector index build and query with the offline embedder, then a full RAG turn with a fake LLM"""
+    if load_langchain()[0] is None:
+        return {'skipped': "FAISS is not installed"}
+    embeddings = HashEmbeddings()
+    index_path = os.path.join(workdir, 'faiss_index')
+    results = {}
+    results['vector_index_build'], store = _once(lambda: sync_vector_store(catalog.spots, embeddings, index_path))
+    results['vector_index_reload'], store = _once(lambda: sync_vector_store(catalog.spots, embeddings, index_path))
+    results['vector_query'], _ = measure(lambda: [store.similarity_search(q, k=3) for q in QUERIES], repeat)
+    results['bm25_build'], lexical = _once(lambda: BM25Index(catalog.spots))
+    retriever = HybridRetriever(lambda: lexical, lambda: store)
+    results['hybrid_retrieve'], _ = measure(lambda: [retriever.retrieve(q) for q in QUERIES], repeat)
+    pipeline = RagPipeline(FakeStreamingLLM(), retriever, embeddings)
+
+    def rag_turn():
+        turn = pipeline.stream(QUERIES[0])
+        for _ in turn:
+            pass
+        return turn.timing
+    results['rag_turn'], timing = measure(rag_turn, repeat)
+    results['rag_turn']['ttft_ms'] = round(timing['ttft_ms'], 3)
+    return results
+
+
+def run(sizes=DEFAULT_SIZES, repeat=5, seed=0, include_retrieval=True):
+    report = {'meta': _environment(), 'sizes': {}}
+    for size in sizes:
+        print(f"== {size} spots", file=sys.stderr)
+        spots = generate_spots(size, seed=seed)
+        with tempfile.TemporaryDirectory(prefix='iki-bench-') as workdir:
+            section = {'reviews': sum(len(s['user_reviews']) for s in spots)}
+            section['store'], catalog = bench_store(spots, workdir, repeat)
+            section['filtering'] = bench_filtering(catalog, repeat)
+            section['map'] = bench_map(catalog, repeat)
+            if include_retrieval:
+                section['retrieval'] = bench_retrieval(catalog, workdir, repeat)
+        report['sizes'][str(size)] = section
+    return report
+
+def _environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
+
+def _flatten(report):
+    flat = {}
+    for size, section in report.get('sizes', {}).items():
+        for group, metrics in section.items():
+            if not isinstance(metrics, dict):
+                continue
+            for name, stats in metrics.items():
+                if isinstance(stats, dict) and 'median_ms' in stats:
+                    flat[f"{size}/{group}/{name}"] = stats['median_ms']
+    return flat
+
+def compare(baseline, current, threshold=REGRESSION_RATIO):
+    """[(metric, baseline_ms, current_ms, ratio)] for metrics present in both reports, slowest change first"""
+    old, new = _flatten(baseline), _flatten(current)
+    rows = [(key, old[key], new[key], new[key] / old[key] if old[key] else float('inf'))
+            for key in new if key in old]
+    rows.sort(key=lambda row: row[3], reverse=True)
+    regressions = [row for row in rows if row[3] >= threshold]
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the content, map and retrieval paths")
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES, help="catalogue sizes, e.g. 1000 10000 100000")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip-retrieval', action='store_true', help="skip the FAISS and RAG benchmarks")
+    parser.add_argument('-o', '--output', help="results file (default: benchmark_results/<commit>-<time>.json)")
+    parser.add_argument('--compare', metavar='BASELINE', help="earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_RATIO,
+                        help="slowdown ratio reported as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.repeat, args.seed, include_retrieval=not args.skip_retrieval)
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{report['meta']['commit'] or 'nocommit'}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    for key, median in _flatten(report).items():
+        print(f"{key:60s} {median:10.2f} ms")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows, regressions = compare(baseline, report, args.threshold)
+        print(f"\nCompared with {args.compare}:")
+        for key, old, new, ratio in rows:
+            flag = "  REGRESSION" if ratio >= args.threshold else ""
+            print(f"{key:60s} {old:10.2f} -> {new:10.2f} ms  x{ratio:.2f}{flag}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ragpipeline import response_text
+
+SUMMARY_PROMPT = """Progressively summarize the conversation between a traveller and a tourist guide, adding onto the previous summary. Keep names of places, dates and preferences the traveller mentioned. Answer with the new summary only.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{lines}
+
+New summary:"""
+
+DEFAULT_KEEP_TURNS = 3
+DEFAULT_TOKEN_BUDGET = 1000
+CHARS_PER_TOKEN = 4
+
+logger = logging.getLogger(__name__)
+# Summaries are written off the request path; a couple of workers serve every session.
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-summary")
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (about four characters per token for English)"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def turn_tokens(turn):
+    human, ai = turn
+    # "Human: " / "Assistant: " labels and newlines.
+    return estimate_tokens(human) + estimate_tokens(ai) + 6
+
+def _truncate(text, tokens):
+    return text if estimate_tokens(text) <= tokens else text[:max(tokens, 0) * CHARS_PER_TOKEN].rstrip() + "…"
+
+
+class ConversationMemory:
+    """One session's chat history, kept under a token budget.
+
+    The last `keep_turns` (question, answer) pairs are sent verbatim; older
+    ones are folded into a running summary by `llm` on a background thread
+    after each answer, so no turn waits for summarization. Until a fold
+    finishes, the not-yet-summarized turns are sent too, as far as the
+    budget allows.
+    """
+
+    def __init__(self, llm_provider, keep_turns=DEFAULT_KEEP_TURNS, token_budget=DEFAULT_TOKEN_BUDGET):
+        self.llm_provider = llm_provider
+        self.keep_turns = keep_turns
+        self.token_budget = token_budget
+        self.turns = []
+        self.summary = ''
+        self.summarized = 0  # turns[:summarized] are covered by the summary
+        self._future = None
+        self._lock = threading.Lock()
+        self.full_tokens = 0
+        self.sent_tokens = 0
+
+    def add_turn(self, question, answer):
+        """Record a finished turn and fold older turns into the summary in the background"""
+        with self._lock:
+            self.turns.append((question, answer))
+            foldable = len(self.turns) - self.keep_turns
+            if foldable <= self.summarized or (self._future is not None and not self._future.done()):
+                return
+            self._future = _executor.submit(self._fold, self.summary, self.summarized, foldable)
+
+    def _fold(self, summary, start, end):
+        turns = self.turns[start:end]
+        lines = "\n".join(f"Human: {human}\nAssistant: {ai}" for human, ai in turns)
+        try:
+            new_summary = response_text(self.llm_provider().invoke(
+                SUMMARY_PROMPT.format(summary=summary or "(none)", lines=lines)
+            )).strip()
+        except Exception:
+            logger.warning("Chat summary update failed; older turns are trimmed instead", exc_info=True)
+            return
+        with self._lock:
+            if new_summary and self.summarized == start:
+                self.summary = new_summary
+                self.summarized = end
+            # More turns may have arrived while this one was running.
+            foldable = len(self.turns) - self.keep_turns
+            if foldable > self.summarized:
+                self._future = _executor.submit(self._fold, self.summary, self.summarized, foldable)
+
+    def context(self):
+        """(summary, [(question, answer), ...]) for the next prompt, within the token budget"""
+        with self._lock:
+            turns = list(self.turns)
+            summary = self.summary
+            summarized = self.summarized
+        recent_start = max(len(turns) - self.keep_turns, summarized)
+        budget = self.token_budget
+        chosen = []
+        # Newest turns first; the latest one is always kept, truncated if it alone is too long.
+        for turn in reversed(turns[recent_start:]):
+            cost = turn_tokens(turn)
+            if cost > budget:
+                if not chosen:
+                    half = max(budget // 2 - 3, 0)
+                    chosen.append((_truncate(turn[0], half), _truncate(turn[1], half)))
+                summary = ''
+                break
+            chosen.append(turn)
+            budget -= cost
+        else:
+            if summary:
+                summary = _truncate(summary, budget)
+                budget -= estimate_tokens(summary)
+            # Turns waiting to be summarized fill whatever budget is left.
+            for turn in reversed(turns[summarized:recent_start]):
+                cost = turn_tokens(turn)
+                if cost > budget:
+                    break
+                chosen.append(turn)
+                budget -= cost
+        chosen.reverse()
+        sent = estimate_tokens(summary) + sum(turn_tokens(t) for t in chosen)
+        full = sum(turn_tokens(t) for t in turns)
+        self.full_tokens += full
+        self.sent_tokens += sent
+        return summary, chosen, {'full_tokens': full, 'sent_tokens': sent}
+
+    def stats(self):
+        saved = self.full_tokens - self.sent_tokens
+        return {
+            'turns': len(self.turns),
+            'summarized_turns': self.summarized,
+            'full_tokens': self.full_tokens,
+            'sent_tokens': self.sent_tokens,
+            'saved_ratio': saved / self.full_tokens if self.full_tokens else 0.0,
+        }
@@ -0,0 +1,139 @@
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+from spotstore import SpotStore, SpotRepository, DEFAULT_JSON_PATH, DEFAULT_DB_PATH
+from spotindex import DEFAULT_INDEX_PATH, VectorStoreHolder
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DESTINATIONS_DIR = os.path.join(BASE_DIR, 'destinations')
+DEFAULT_DESTINATION = "Iki Island"
+DEFAULT_MEMORY_BUDGET_MB = 1024
+# Parsed spots, search indexes and their dicts take several times the JSON size.
+PYTHON_OVERHEAD_FACTOR = 5
+
+Destination = namedtuple('Destination', ['name', 'slug', 'json_path', 'db_path', 'index_path'])
+
+
+def destination_slug(name):
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+def destination_paths(name):
+    """Shard files for a destination; Iki Island keeps the original top-level files"""
+    slug = destination_slug(name)
+    if name == DEFAULT_DESTINATION:
+        return Destination(name, slug, DEFAULT_JSON_PATH, DEFAULT_DB_PATH, DEFAULT_INDEX_PATH)
+    folder = os.path.join(DESTINATIONS_DIR, slug)
+    return Destination(name, slug, os.path.join(folder, 'tourist_spots.json'),
+                       os.path.join(folder, 'tourist_spots.db'), os.path.join(folder, 'faiss_index'))
+
+
+class DestinationData:
+    """Everything loaded for one destination: its spot store, vector store and derived indexes.
+
+    Further per-destination objects (search indexes, the RAG pipeline, ...)
+    hang off `resource()` and `versioned()`, so they are dropped together
+    when the destination is evicted.
+    """
+
+    def __init__(self, destination, vector_loader):
+        self.destination = destination
+        os.makedirs(os.path.dirname(destination.db_path), exist_ok=True)
+        self.store = SpotStore(destination.db_path, destination.json_path)
+        self.repository = SpotRepository(self.store)
+        self.vector_holder = VectorStoreHolder(lambda data: vector_loader(destination, data))
+        self._resources = {}
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self.destination.name
+
+    def resource(self, key, factory):
+        """Build `factory()` once per destination and keep it until eviction"""
+        value = self._resources.get(key)
+        if value is None:
+            with self._lock:
+                value = self._resources.get(key)
+                if value is None:
+                    value = self._resources[key] = factory()
+        return value
+
+    def versioned(self, key, version, factory):
+        """Like resource(), but rebuilt whenever `version` changes"""
+        entry = self._resources.get(key)
+        if entry is None or entry[0] != version:
+            with self._lock:
+                entry = self._resources.get(key)
+                if entry is None or entry[0] != version:
+                    entry = self._resources[key] = (version, factory())
+        return entry[1]
+
+    def estimated_bytes(self):
+        """Rough resident size: parsed catalogue plus the loaded FAISS vectors"""
+        try:
+            size = os.path.getsize(self.destination.json_path) * PYTHON_OVERHEAD_FACTOR
+        except OSError:
+            size = 0
+        store = self.vector_holder.get()
+        index = getattr(store, 'index', None)
+        if index is not None:
+            size += index.ntotal * index.d * 4
+        return size
+
+
+class DestinationCache:
+    """Process-wide LRU of DestinationData, bounded by an estimated memory budget.
+
+    A destination is only loaded when someone visits it, so adding
+    destinations costs nothing at startup. When the loaded ones exceed
+    `max_bytes`, the least recently used are dropped (never the one being
+    returned).
+    """
+
+    def __init__(self, factory, max_bytes=DEFAULT_MEMORY_BUDGET_MB * 1024 * 1024):
+        self.factory = factory
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+        self.evictions = 0
+
+    def get(self, name):
+        with self._lock:
+            data = self._entries.get(name)
+            if data is not None:
+                # Repeated lookups of the current destination are the common case; keep them cheap.
+                if next(reversed(self._entries)) != name:
+                    self._entries.move_to_end(name)
+                    self._evict(keep=name)
+                return data
+            load_lock = self._loading.setdefault(name, threading.Lock())
+        # Load outside the cache lock so other destinations stay available meanwhile.
+        with load_lock:
+            with self._lock:
+                data = self._entries.get(name)
+            if data is None:
+                data = self.factory(name)
+                with self._lock:
+                    self._entries[name] = data
+                    self._loading.pop(name, None)
+        with self._lock:
+            self._evict(keep=name)
+        return data
+
+    def _evict(self, keep):
+        total = sum(data.estimated_bytes() for data in self._entries.values())
+        for name in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            total -= self._entries.pop(name).estimated_bytes()
+            self.evictions += 1
+
+    def loaded(self):
+        """[(name, estimated_bytes)] from least to most recently used"""
+        with self._lock:
+            return [(name, data.estimated_bytes()) for name, data in self._entries.items()]
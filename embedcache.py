@@ -0,0 +1,185 @@
+import hashlib
+import math
+import os
+import time
+from array import array
+
+from sqlitedb import ThreadLocalConnection
+
+try:
+    from langchain_core.embeddings import Embeddings
+except Exception:
+    try:
+        from langchain.embeddings.base import Embeddings
+    except Exception:
+        Embeddings = object
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'embedding_cache.db')
+DEFAULT_MAX_ENTRIES = 50000
+LOOKUP_BATCH = 500
+# last_used only drives LRU eviction, so a hit rewrites it at most this often (seconds).
+LAST_USED_RESOLUTION = 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, text_hash)
+);
+CREATE INDEX IF NOT EXISTS embeddings_by_use ON embeddings (last_used);
+"""
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def _pack(vector):
+    return array('f', vector).tobytes()
+
+def _unpack(blob):
+    vector = array('f')
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+class EmbeddingCache:
+    """Disk-backed embedding cache keyed by (model, sha256(text)).
+
+    Vectors are stored as raw float32 blobs. Once the cache grows past
+    `max_entries` (unless it is None), the least recently used rows are
+    evicted; recency is tracked to within LAST_USED_RESOLUTION.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._connect = ThreadLocalConnection(path)
+        self._connect().executescript(SCHEMA)
+
+    def get_many(self, model, texts):
+        """Return a list aligned with `texts`; misses are None"""
+        hashes = [text_hash(text) for text in texts]
+        found = {}
+        stale = []
+        now = time.time()
+        conn = self._connect()
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), LOOKUP_BATCH):
+            chunk = unique[start:start + LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f"SELECT text_hash, vector, last_used FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                [model, *chunk],
+            ).fetchall()
+            for h, blob, last_used in rows:
+                found[h] = _unpack(blob)
+                if now - last_used > LAST_USED_RESOLUTION:
+                    stale.append(h)
+        if stale:
+            # Hot entries are read without a write; only timestamps older than the resolution are refreshed.
+            conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                [(now, model, h) for h in stale],
+            )
+        return [found.get(h) for h in hashes]
+
+    def put_many(self, model, texts, vectors):
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(model, text_hash(text), _pack(vector), now) for text, vector in zip(texts, vectors)],
+            )
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn):
+        if self.max_entries is None:
+            return
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """LangChain embeddings wrapper that serves repeated texts from an EmbeddingCache"""
+
+    def __init__(self, embeddings, cache, model_name=None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name or getattr(embeddings, 'model', None) or type(embeddings).__name__
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        vectors = self.cache.get_many(self.model_name, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            # Embed each distinct missing text once, even if it repeats in the batch.
+            missing_texts = list(dict.fromkeys(texts[i] for i in missing))
+            fresh = self.embeddings.embed_documents(missing_texts)
+            self.cache.put_many(self.model_name, missing_texts, fresh)
+            # Round-trip through float32 so hits and misses return identical values.
+            by_text = {text: _unpack(_pack(vector)) for text, vector in zip(missing_texts, fresh)}
+            for i in missing:
+                vectors[i] = list(by_text[texts[i]])
+        return vectors
+
+    def embed_query(self, text):
+        # Queries use a different task type than documents for Gemini embeddings.
+        model = f"{self.model_name}#query"
+        vector = self.cache.get_many(model, [text])[0]
+        if vector is not None:
+            self.hits += 1
+            return vector
+        self.misses += 1
+        vector = self.embeddings.embed_query(text)
+        self.cache.put_many(model, [text], [vector])
+        return _unpack(_pack(vector))
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic, offline stand-in for a remote embedding model.
+
+    Hashes word unigrams into a fixed number of buckets and L2-normalises the
+    result, so texts sharing words land close together. Useful for tests,
+    benchmarks and running the guide without an API key.
+    """
+
+    def __init__(self, dimensions=256, model='local-hash'):
+        self.dimensions = dimensions
+        self.model = model
+
+    def _embed(self, text):
+        vector = [0.0] * self.dimensions
+        for token in text.lower().split():
+            digest = hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], 'little') % self.dimensions
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
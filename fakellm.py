@@ -0,0 +1,195 @@
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llmscheduler import LLMScheduler, ScheduledLLM
+
+DEFAULT_ANSWER = "Kojima Shrine sits on a tiny island reachable on foot at low tide."
+DEFAULT_PORT = 8765
+
+
+class RateLimitError(RuntimeError):
+    status_code = 429
+
+
+class FakeLLMServer:
+    """Local HTTP stand-in for an LLM API: streams a fixed answer and returns 429 above `max_concurrency`.
+
+    POST /v1/complete with {"prompt": ..., "stream": bool}; streamed answers
+    come back one word per line. Run it with `python fakellm.py serve` and
+    point the app at it with IKI_LLM_URL.
+    """
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, answer=DEFAULT_ANSWER, chunk_delay_ms=20,
+                 max_concurrency=4):
+        self.answer = answer
+        self.chunk_delay_ms = chunk_delay_ms
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self.peak_concurrency = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _admit(self):
+        with self._lock:
+            self.requests += 1
+            if self.active >= self.max_concurrency:
+                self.rate_limited += 1
+                return False
+            self.active += 1
+            self.peak_concurrency = max(self.peak_concurrency, self.active)
+            return True
+
+    def _leave(self):
+        with self._lock:
+            self.active -= 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != '/v1/complete':
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if not server._admit():
+                    self.send_error(429, "Resource exhausted")
+                    return
+                try:
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; charset=utf-8')
+                    self.end_headers()
+                    for word in server.answer.split(' '):
+                        time.sleep(server.chunk_delay_ms / 1000)
+                        if body.get('stream'):
+                            self.wfile.write(f"{word} \n".encode('utf-8'))
+                            self.wfile.flush()
+                    if not body.get('stream'):
+                        self.wfile.write(server.answer.encode('utf-8'))
+                finally:
+                    server._leave()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="fake-llm", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self):
+        with self._lock:
+            return {'requests': self.requests, 'rate_limited': self.rate_limited,
+                    'peak_concurrency': self.peak_concurrency}
+
+
+class FakeLLMClient:
+    """Chat model client for FakeLLMServer with the invoke()/stream() interface the app uses"""
+
+    def __init__(self, url, timeout=60):
+        self.url = url.rstrip('/')
+        self.model = f"fake-llm@{self.url}"
+        self.timeout = timeout
+
+    def _post(self, prompt, stream):
+        request = urllib.request.Request(
+            f"{self.url}/v1/complete", data=json.dumps({'prompt': prompt, 'stream': stream}).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                raise RateLimitError("429 Resource exhausted") from None
+            raise
+
+    def invoke(self, prompt):
+        with self._post(prompt, stream=False) as response:
+            return response.read().decode('utf-8')
+
+    def stream(self, prompt):
+        with self._post(prompt, stream=True) as response:
+            for line in response:
+                yield line.decode('utf-8').rstrip('\n')
+
+
+def load_test(llm, sessions=8, requests_per_session=4, distinct_prompts=8):
+    """Stream answers from `sessions` concurrent users; returns latency and error stats"""
+    prompts = [f"Tell me about spot {i}" for i in range(distinct_prompts)]
+    latencies = []
+    errors = []
+
+    def user(session):
+        for n in range(requests_per_session):
+            started = time.perf_counter()
+            try:
+                ''.join(llm.stream(prompts[(session + n) % distinct_prompts]))
+                latencies.append((time.perf_counter() - started) * 1000)
+            except Exception as e:
+                errors.append(type(e).__name__)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        list(pool.map(user, range(sessions)))
+    return {
+        'wall_ms': round((time.perf_counter() - started) * 1000, 1),
+        'ok': len(latencies),
+        'errors': len(errors),
+        'median_ms': round(statistics.median(latencies), 1) if latencies else None,
+        'max_ms': round(max(latencies), 1) if latencies else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local fake LLM server and scheduler load test")
+    parser.add_argument('command', choices=['serve', 'loadtest'])
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="serve: port (loadtest uses a free port)")
+    parser.add_argument('--max-concurrency', type=int, default=4, help="requests above this get a 429")
+    parser.add_argument('--chunk-delay-ms', type=float, default=20)
+    parser.add_argument('--sessions', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=4, help="requests per session")
+    parser.add_argument('--concurrency', type=int, default=4, help="scheduler pool size")
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        server = FakeLLMServer(port=args.port, chunk_delay_ms=args.chunk_delay_ms, max_concurrency=args.max_concurrency)
+        print(f"Fake LLM listening on {server.url} (set IKI_LLM_URL={server.url})")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    for label, scheduled in (('direct', False), ('scheduled', True)):
+        server = FakeLLMServer(port=0, chunk_delay_ms=args.chunk_delay_ms, max_concurrency=args.max_concurrency).start()
+        client = FakeLLMClient(server.url)
+        scheduler = LLMScheduler(concurrency=args.concurrency)
+        # Each load-test thread plays one session.
+        llm = ScheduledLLM(client, scheduler, lambda: threading.current_thread().name) if scheduled else client
+        result = load_test(llm, args.sessions, args.requests)
+        server.stop()
+        print(f"{label:10s} {result} upstream={server.stats()}" + (f" scheduler={scheduler.stats()}" if scheduled else ""))
+
+
+if __name__ == "__main__":
+    main()
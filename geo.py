@@ -0,0 +1,121 @@
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+DEFAULT_CELL_DEGREES = 0.05
+SAMPLE_GRID = 16
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; any argument may be a NumPy array"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def bbox_around(lat, lon, km):
+    """(south, west, north, east) box that contains the circle of radius `km`"""
+    dlat = km / KM_PER_DEGREE_LAT
+    dlon = km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+
+class SpatialIndex:
+    """Uniform lat/lon grid over spot coordinates.
+
+    Radius and bounding-box queries only look at the grid cells they overlap,
+    then filter those candidates with vectorized NumPy math, so query time
+    depends on how many spots are nearby rather than on catalogue size.
+    """
+
+    def __init__(self, spots, cell_degrees=DEFAULT_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.spots = [s for s in spots if s.get('coordinates') and len(s['coordinates']) >= 2]
+        coords = np.array([s['coordinates'][:2] for s in self.spots], dtype=np.float64).reshape(-1, 2)
+        self.lats = coords[:, 0]
+        self.lons = coords[:, 1]
+        self.position_by_id = {s.get('id'): i for i, s in enumerate(self.spots)}
+        cells = {}
+        for i, key in enumerate(zip(self._cell(self.lats), self._cell(self.lons))):
+            cells.setdefault(key, []).append(i)
+        self.cells = {key: np.array(members, dtype=np.intp) for key, members in cells.items()}
+
+    def __len__(self):
+        return len(self.spots)
+
+    def _cell(self, value):
+        return np.floor(np.asarray(value) / self.cell_degrees).astype(np.int64).tolist()
+
+    def _candidates(self, south, west, north, east):
+        y0, y1 = self._cell(south), self._cell(north)
+        x0, x1 = self._cell(west), self._cell(east)
+        if (y1 - y0 + 1) * (x1 - x0 + 1) > len(self.cells):
+            # A box covering more cells than exist is cheaper to scan by cell list.
+            found = [m for (y, x), m in self.cells.items() if y0 <= y <= y1 and x0 <= x <= x1]
+        else:
+            found = [self.cells[(y, x)] for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)
+                     if (y, x) in self.cells]
+        if not found:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(found)
+
+    def _in_bbox(self, south, west, north, east):
+        idx = self._candidates(south, west, north, east)
+        if idx.size:
+            lats, lons = self.lats[idx], self.lons[idx]
+            idx = np.sort(idx[(lats >= south) & (lats <= north) & (lons >= west) & (lons <= east)])
+        return idx
+
+    def in_bbox(self, south, west, north, east, limit=None):
+        """Spots inside the box, in catalogue order"""
+        idx = self._in_bbox(south, west, north, east)
+        if limit is not None:
+            idx = idx[:limit]
+        return [self.spots[i] for i in idx]
+
+    def sample_bbox(self, south, west, north, east, limit, grid=SAMPLE_GRID):
+        """(spots, total): at most `limit` of the `total` spots inside the box, spread over all of it.
+
+        The box is split into grid x grid cells and spots are taken one per
+        cell in turn, so a crowded corner can't use up the whole limit.
+        """
+        idx = self._in_bbox(south, west, north, east)
+        total = int(idx.size)
+        if total > limit:
+            rows = np.clip(((self.lats[idx] - south) / max(north - south, 1e-9) * grid).astype(np.int64), 0, grid - 1)
+            cols = np.clip(((self.lons[idx] - west) / max(east - west, 1e-9) * grid).astype(np.int64), 0, grid - 1)
+            cells = rows * grid + cols
+            order = np.argsort(cells, kind='stable')
+            sorted_cells = cells[order]
+            starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+            # Position of each spot within its cell: 0 for the first, 1 for the second, ...
+            rank = np.arange(total) - np.repeat(starts, np.diff(np.r_[starts, total]))
+            idx = np.sort(idx[order[np.argsort(rank, kind='stable')[:limit]]])
+        return [self.spots[i] for i in idx], total
+
+    def within(self, lat, lon, km, limit=None, exclude_id=None):
+        """[(spot, distance_km)] within `km` of (lat, lon), nearest first"""
+        idx = self._candidates(*bbox_around(lat, lon, km))
+        if not idx.size:
+            return []
+        distances = haversine_km(lat, lon, self.lats[idx], self.lons[idx])
+        keep = distances <= km
+        idx, distances = idx[keep], distances[keep]
+        order = np.argsort(distances, kind='stable')
+        results = []
+        for i in order:
+            spot = self.spots[idx[i]]
+            if exclude_id is not None and spot.get('id') == exclude_id:
+                continue
+            results.append((spot, float(distances[i])))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def near_spot(self, spot_id, km, limit=None):
+        """Other spots within `km` of the given spot, nearest first"""
+        i = self.position_by_id.get(spot_id)
+        if i is None:
+            return []
+        return self.within(self.lats[i], self.lons[i], km, limit=limit, exclude_id=spot_id)
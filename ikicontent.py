@@ -1,217 +1,645 @@
 import streamlit as st
-import json
+import argparse
+import copy
+import importlib
 import os
-import traceback
+import sys
+import threading
 import time
-import folium
-from streamlit_folium import st_folium
-from folium.plugins import MarkerCluster
+import traceback
 import streamlit.components.v1 as components
 from dotenv import load_dotenv
 import utils
+import images
+import metrics
+from spotstore import RECENT_REVIEW_DAYS
+from spotindex import sync_vector_store
+from destinations import (DEFAULT_DESTINATION, DEFAULT_MEMORY_BUDGET_MB, DestinationCache, DestinationData,
+                          destination_paths)
+from answercache import SemanticAnswerCache
+from llmscheduler import LLMScheduler, ScheduledEmbeddings, ScheduledLLM, SchedulerBusy, DEFAULT_CONCURRENCY
+from chathistory import ConversationMemory, DEFAULT_KEEP_TURNS, DEFAULT_TOKEN_BUDGET
+from ragpipeline import RagPipeline
+from reviewdigest import ReviewDigester
+from search import BM25Index, HybridRetriever, SpotSearchIndex, MONTHS, DURATION_BUCKETS
+from mapview import (DEFAULT_CENTER, MAX_VIEWPORT_MARKERS, VIEWPORT_MARKER_THRESHOLD, build_spots_map, viewport_layer,
+                     route_layer, bounds_from_map_state)
+from geo import SpatialIndex, bbox_around
+from itinerary import DistanceMatrix, plan_route
+from avatar import guide_avatar
+
+# LangChain, the Gemini client and folium are imported on first use (see
+# _google_genai, spotindex.load_langchain and mapview._folium) so the landing
+# page can paint before they load; warm_ai_guide preloads them in the background.
 
-try:
-    from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-except Exception:
-    ChatGoogleGenerativeAI = None
-    GoogleGenerativeAIEmbeddings = None
+load_dotenv()
 
-try:
-    from langchain_community.vectorstores import FAISS
-except Exception:
-    try:
-        from langchain.vectorstores import FAISS
-    except Exception:
-        FAISS = None
+EMBEDDING_MODEL = "models/embedding-001"
+PLANNER_OPTION_LIMIT = 50
+NEARBY_RADIUS_KM = 5
+NEARBY_LIMIT = 3
+SPOTS_PAGE_SIZE = 12
+REVIEWS_PAGE_SIZE = 5
+# Session-state keys kept per spot id by the review widgets.
+SPOT_STATE_PREFIXES = ('review_input_', 'reviews_page_', 'review_flash_', 'reviews_')
 
-try:
-    from langchain_core.documents import Document
-except Exception:
-    try:
-        from langchain.schema import Document
-    except Exception:
-        Document = None
 
-try:
-    from langchain.chains import ConversationalRetrievalChain
-except Exception:
-    try:
-        from langchain_core.chains import ConversationalRetrievalChain
-    except Exception:
-        ConversationalRetrievalChain = None
+def current_destination():
+    """Destination chosen on the landing page for this session"""
+    name = st.session_state.get('destination', DEFAULT_DESTINATION)
+    return name if name in utils.LOCATIONS else DEFAULT_DESTINATION
 
-load_dotenv()
+def _load_destination(name):
+    return DestinationData(destination_paths(name), get_vector_store)
+
+@st.cache_resource
+def get_destination_cache():
+    """Process-wide LRU of loaded destinations; each is loaded on its first visit"""
+    budget_mb = int(os.getenv("IKI_DESTINATION_MEMORY_MB", DEFAULT_MEMORY_BUDGET_MB))
+    return DestinationCache(_load_destination, max_bytes=budget_mb * 1024 * 1024)
 
+def get_destination_data(name=None):
+    return get_destination_cache().get(name or current_destination())
+
+def get_spot_store(data=None):
+    """Spot/review store of the current destination, shared by every session"""
+    return (data or get_destination_data()).store
+
+def get_spot_repository(data=None):
+    """Shared, versioned catalogue; reparsed only when the store changes"""
+    return (data or get_destination_data()).repository
+
+def get_spot_catalog(data=None):
+    with metrics.span("catalog.snapshot"):
+        return get_spot_repository(data).snapshot()
 
 def load_tourist_spots():
-    json_path = os.path.join(os.path.dirname(__file__), 'tourist_spots.json')
-    if not os.path.exists(json_path):
-        return []
-    with open(json_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    """Every spot with its `user_reviews`, in the tourist_spots.json format (the catalogue omits reviews)"""
+    return get_spot_store().load_spots()
 
 def save_tourist_spots(data):
-    json_path = os.path.join(os.path.dirname(__file__), 'tourist_spots.json')
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    get_spot_store().save_spots(data)
+
+def export_tourist_spots(path=None):
+    """Write the store back out in the tourist_spots.json format"""
+    return get_spot_store().export_json(path)
 
 def add_review(spot_id, user_review):
-    """Save a new review to the JSON file"""
-    spots = load_tourist_spots()
-    for spot in spots:
-        if spot.get('id') == spot_id:
-            if 'user_reviews' not in spot:
-                spot['user_reviews'] = []
-            spot['user_reviews'].append({
-                "content": user_review,
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-            })
-            break
-    save_tourist_spots(spots)
+    """Save a new review to the spot store"""
+    return get_spot_store().add_review(spot_id, user_review)
+
+def _google_genai():
+    """The langchain_google_genai module, or None when it isn't installed"""
+    try:
+        import langchain_google_genai
+    except Exception:
+        return None
+    return langchain_google_genai
+
+def _session_id():
+    """Streamlit session of the calling thread; None on background threads"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx else None
+
+@st.cache_resource
+def get_llm_scheduler():
+    """Admission control shared by every LLM and embedding call in the process (IKI_LLM_CONCURRENCY slots)"""
+    return LLMScheduler(concurrency=int(os.getenv("IKI_LLM_CONCURRENCY", DEFAULT_CONCURRENCY)))
 
 @st.cache_resource
 def load_llm():
-    """Cache the LLM instance to prevent reload delays"""
+    """Cache the LLM instance to prevent reload delays; set IKI_LLM_URL to use a local fakellm server"""
+    if os.getenv("IKI_LLM_URL"):
+        from fakellm import FakeLLMClient
+        return ScheduledLLM(FakeLLMClient(os.getenv("IKI_LLM_URL")), get_llm_scheduler(), _session_id)
     api_key = os.getenv("GEMINI_API_KEY")
-    if ChatGoogleGenerativeAI is None:
+    genai = _google_genai()
+    if genai is None:
         raise ImportError("ChatGoogleGenerativeAI is not available. Install 'langchain-google-genai' and restart the app.")
-    return ChatGoogleGenerativeAI(model="gemini-2.0-flash", google_api_key=api_key, temperature=0)
-
-def get_vector_store(data):
-    INDEX_PATH = "faiss_index"
+    llm = genai.ChatGoogleGenerativeAI(model="gemini-2.0-flash", google_api_key=api_key, temperature=0)
+    return ScheduledLLM(llm, get_llm_scheduler(), _session_id)
+
+def get_review_digester(data=None):
+    """Background "what visitors say" summaries for the current destination"""
+    data = data or get_destination_data()
+    return data.resource('review_digester', lambda: ReviewDigester(data.store, load_llm, destination=data.name))
+
+def embedding_client():
+    """Uncached embedding client; set IKI_EMBEDDINGS=local to run without the Gemini API"""
+    if os.getenv("IKI_EMBEDDINGS") == "local":
+        from embedcache import HashEmbeddings
+        return HashEmbeddings()
     api_key = os.getenv("GEMINI_API_KEY")
-    if GoogleGenerativeAIEmbeddings is None:
+    genai = _google_genai()
+    if genai is None:
         raise ImportError("GoogleGenerativeAIEmbeddings is not available. Install 'langchain-google-genai' and restart the app.")
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=api_key) 
+    return genai.GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL, google_api_key=api_key)
 
-    if os.path.exists(INDEX_PATH):
-        if FAISS is None:
-            raise ImportError("FAISS vectorstore not available. Install 'langchain_community' or compatible 'langchain' package.")
-        return FAISS.load_local(INDEX_PATH, embeddings, allow_dangerous_deserialization=True)
-    
-    if data:
-        documents = []
-        for item in data:
-            content = f"Spot Name: {item.get('name')}. Category: {item.get('category')}. " \
-                      f"Description: {item.get('shortDescription')}. Highlights: {', '.join(item.get('highlights', []))}"
-            if Document is None:
-                raise ImportError("Document class is not available from LangChain. Install compatible 'langchain_core' or 'langchain' package.")
-            documents.append(Document(page_content=content, metadata={"name": item.get("name")}))
-        
-        if FAISS is None:
-            raise ImportError("FAISS vectorstore not available. Install 'langchain_community' or compatible 'langchain' package.")
+def vector_index_path(destination=None):
+    index_path = (destination or destination_paths(DEFAULT_DESTINATION)).index_path
+    # Local embeddings have a different dimension, so they get their own index.
+    return f"{index_path}_local" if os.getenv("IKI_EMBEDDINGS") == "local" else index_path
+
+@st.cache_resource
+def get_embeddings():
+    """Cached embedding client shared by every session"""
+    from embedcache import EmbeddingCache, CachedEmbeddings
+    base = embedding_client()
+    scheduled = ScheduledEmbeddings(base, get_llm_scheduler(), _session_id)
+    return CachedEmbeddings(scheduled, EmbeddingCache(), model_name=getattr(base, 'model', EMBEDDING_MODEL))
+
+def get_vector_store(destination, data):
+    """Load a destination's FAISS index, embedding only spots added or changed since the last build"""
+    return sync_vector_store(data, get_embeddings(), vector_index_path(destination))
+
+def get_vector_store_holder(data=None):
+    """One vector store per destination, shared by every session"""
+    return (data or get_destination_data()).vector_holder
+
+def get_lexical_index(catalog, data=None):
+    """BM25 index over the spot catalogue, rebuilt only when spot fields change (reviews aren't indexed)"""
+    return (data or get_destination_data()).versioned(
+        'lexical_index', catalog.spots_digest, lambda: BM25Index(catalog.spots)
+    )
+
+def get_search_index(catalog, data=None):
+    """Faceted search index per destination, updated incrementally when spot data changes"""
+    index = (data or get_destination_data()).resource('search_index', SpotSearchIndex)
+    if index.version != catalog.spots_digest:
+        # Searches in other sessions wait on the index's lock rather than seeing a half-applied sync.
+        index.sync(catalog.spots, version=catalog.spots_digest)
+    return index
+
+@st.cache_resource
+def get_answer_cache():
+    """Semantic answer cache shared by every session"""
+    return SemanticAnswerCache()
+
+def get_rag_pipeline(data=None):
+    """Streaming retrieval pipeline, built once per destination and shared by every session"""
+    data = data or get_destination_data()
+
+    def build():
+        holder = data.vector_holder
+        retriever = HybridRetriever(
+            lexical_provider=lambda: get_lexical_index(data.repository.snapshot(), data),
+            store_provider=holder.get,
+        )
+        return RagPipeline(
+            llm=load_llm(),
+            retriever=retriever,
+            embeddings=get_embeddings(),
+            answer_cache=get_answer_cache(),
+            # Answers are only reused within the same destination and spot content: holder.version is the
+            # spots_digest the index was built from, so new reviews don't orphan cached answers.
+            scope_provider=lambda: (data.destination.slug, holder.version),
+        )
+    return data.resource('rag_pipeline', build)
+
+def _warm_up():
+    # Only the default destination is preloaded; the others load on first visit.
+    steps = [
+        ("spot repository", lambda: get_spot_catalog(get_destination_data(DEFAULT_DESTINATION))),
+        ("map libraries", lambda: importlib.import_module('streamlit_folium')),
+        ("LLM client", load_llm),
+        ("vector store", lambda: _warm_vector_store(get_destination_data(DEFAULT_DESTINATION))),
+    ]
+    for label, step in steps:
+        try:
+            with metrics.span(f"warmup.{label.replace(' ', '_')}"):
+                step()
+        except Exception as e:
+            # The page reports the error when the feature is actually used.
+            print(f"Warm-up of the {label} skipped: {type(e).__name__}: {e}")
 
-        vector_store = FAISS.from_documents(documents, embeddings)
-        vector_store.save_local(INDEX_PATH)
-        return vector_store
-    return None
+def _warm_vector_store(data):
+    data.vector_holder.ensure(data.repository.snapshot())
 
-def render_sidebar_chatbot(tourist_data):
-    st.sidebar.header("Iki Island AI Guide")
+@st.cache_resource
+def warm_ai_guide():
+    """Preload the spot repository, map libraries, LLM client and vector store in the background, once per server process"""
+    thread = threading.Thread(target=_warm_up, name="ai-guide-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def get_spots_map(catalog, include_markers=True, data=None):
+    """Folium map fitted to the spots, built once per spot-data version"""
+    def build():
+        with metrics.span("map.build"):
+            return build_spots_map(catalog.spots, include_markers=include_markers)
+    return (data or get_destination_data()).versioned(f'spots_map_{include_markers}', catalog.spots_digest, build)
+
+def get_spatial_index(catalog, data=None):
+    """Grid index over spot coordinates, built once per spot-data version"""
+    return (data or get_destination_data()).versioned(
+        'spatial_index', catalog.spots_digest, lambda: SpatialIndex(catalog.spots)
+    )
+
+def get_distance_matrix(catalog, data=None):
+    """Spot-to-spot distances for the day planner, built once per spot-data version"""
+    def build():
+        with metrics.span("itinerary.matrix"):
+            return DistanceMatrix(catalog.spots)
+    return (data or get_destination_data()).versioned('distance_matrix', catalog.spots_digest, build)
+
+@st.fragment
+def render_spots_map(catalog):
+    """Every marker for small catalogues; above VIEWPORT_MARKER_THRESHOLD, only those in view.
+
+    A fragment, like the spot browser and the chat: panning reruns only the
+    map, and their reruns don't re-send it (the script, marker data included,
+    goes to the browser on every run that draws it).
+    """
+    from streamlit_folium import st_folium
+    map_center = st.session_state.get('map_center')
+    map_zoom = st.session_state.get('map_zoom')
+    planned = get_itinerary(catalog)
+    route = route_layer(planned[0]) if planned and planned[0].stops else None
+    if len(catalog.spots) <= VIEWPORT_MARKER_THRESHOLD:
+        # The cached map is shared by every session; layers go on this run's own copy.
+        spots_map = copy.deepcopy(get_spots_map(catalog))
+        with metrics.span("map.st_folium"):
+            st_folium(
+                spots_map,
+                center=map_center,
+                zoom=map_zoom,
+                key="spots_map",
+                width="100%",
+                height=480,
+                feature_group_to_add=route,
+                returned_objects=[],
+            )
+        return
+
+    spatial = get_spatial_index(catalog)
+    # st_folium saves the bounds it reports under its key before this rerun starts, so a pan
+    # draws the markers for the new view in this run rather than in a second one.
+    moved = bounds_from_map_state(st.session_state.get('spots_map_viewport'))
+    if moved is not None and moved != st.session_state.get('spots_map_seen'):
+        st.session_state['spots_map_seen'] = moved
+        st.session_state['spots_map_bounds'] = moved
+    view = st.session_state.get('spots_map_bounds')
+    if view is None:
+        origin = map_center or (spatial.spots[0]['coordinates'] if len(spatial) else DEFAULT_CENTER)
+        view = bbox_around(origin[0], origin[1], NEARBY_RADIUS_KM)
+    visible, total = spatial.sample_bbox(*view, MAX_VIEWPORT_MARKERS)
+    spots_map = copy.deepcopy(get_spots_map(catalog, include_markers=False))
+    layer = viewport_layer(visible)
+    with metrics.span("map.st_folium"):
+        st_folium(
+            spots_map,
+            center=map_center,
+            zoom=map_zoom,
+            key="spots_map_viewport",
+            width="100%",
+            height=480,
+            feature_group_to_add=[layer, route] if route else layer,
+            returned_objects=["bounds"],
+        )
+    if total > len(visible):
+        st.caption(f"Showing {len(visible)} of the {total:,} spots in view, spread across the map; "
+                   f"zoom in to see the other {total - len(visible):,}.")
+
+def get_chat_memory():
+    """This session's compacted chat history (IKI_HISTORY_KEEP_TURNS verbatim, IKI_HISTORY_TOKEN_BUDGET in total)"""
+    if "chat_memory" not in st.session_state:
+        st.session_state.chat_memory = ConversationMemory(
+            load_llm,
+            keep_turns=int(os.getenv("IKI_HISTORY_KEEP_TURNS", DEFAULT_KEEP_TURNS)),
+            token_budget=int(os.getenv("IKI_HISTORY_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET)),
+        )
+    return st.session_state.chat_memory
+
+def render_sidebar_chatbot():
+    with st.sidebar:
+        _chatbot_fragment()
+
+@st.fragment
+def _chatbot_fragment():
+    """Chat UI; submitting a message reruns only this fragment, not the map and cards"""
+    catalog = get_spot_catalog()
+    st.header(f"{current_destination()} AI Guide")
     
-    avatar_placeholder = st.sidebar.empty()
-    avatar_placeholder.image("idle.png", use_container_width=True)
+    guide_avatar()
 
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
     
-    if "vector_store" not in st.session_state:
-        avatar_placeholder.image("thinking.png", use_container_width=True)
-        with st.sidebar:
-            with st.spinner("Preparing AI Guide..."):
-                st.session_state.vector_store = get_vector_store(tourist_data)
-        avatar_placeholder.image("idle.png", use_container_width=True)
-
-    chat_container = st.sidebar.container(height=450)
+    holder = get_vector_store_holder()
+    if holder.get() is None:
+        with st.spinner("Preparing AI Guide..."), metrics.span("chat.vector_store_load"):
+            holder.ensure(catalog)
+    else:
+        # Picks up new or edited spots in the background; the current index keeps serving.
+        holder.ensure(catalog, wait=False)
+
+    chat_container = st.container(height=450)
     for message in st.session_state.chat_history:
         with chat_container.chat_message(message["role"]):
             st.markdown(message["content"])
-    if prompt := st.sidebar.chat_input("Ask about Iki Island..."):
+    if prompt := st.chat_input(f"Ask about {current_destination()}..."):
         st.session_state.chat_history.append({"role": "user", "content": prompt})
         with chat_container.chat_message("user"):
             st.markdown(prompt)
-        avatar_placeholder.image("thinking.png", use_container_width=True)
         
-        with st.sidebar:
-            llm = load_llm()
-            qa_chain = ConversationalRetrievalChain.from_llm(
-                llm=llm,
-                retriever=st.session_state.vector_store.as_retriever(search_kwargs={"k": 3}),
-            )
-
-            with chat_container.chat_message("assistant"):
-                response_placeholder = st.empty()
-                full_response = ""
+        with chat_container.chat_message("assistant"):
+            response_placeholder = st.empty()
+            full_response = ""
+            
+            try:
+                memory = get_chat_memory()
+                summary, recent_turns, history_tokens = memory.context()
+                record_history_metrics(history_tokens)
+                turn = get_rag_pipeline().stream(prompt, recent_turns, summary)
+                
+                for content_chunk in turn:
+                    full_response += content_chunk
+                    response_placeholder.markdown(full_response + "▌")
+                        
+                response_placeholder.markdown(full_response)
                 
-                try:
-                    history_tuples = []
-                    messages = st.session_state.chat_history[:-1]
-                    for i in range(0, len(messages) - 1, 2):
-                        if messages[i]["role"] == "user" and messages[i + 1]["role"] == "assistant":
-                            history_tuples.append((messages[i]["content"], messages[i + 1]["content"]))
-                    
-                    stream_res = qa_chain.stream({
-                        "question": prompt, 
-                        "chat_history": history_tuples
-                    })
-                    
-                    has_started_speaking = False
-                    
-                    for chunk in stream_res:
-                        if 'answer' in chunk:
-                            if not has_started_speaking:
-                                avatar_placeholder.image("speaking.png", use_container_width=True)
-                                has_started_speaking = True
-                            
-                            content_chunk = chunk['answer']
-                            full_response += content_chunk
-                            response_placeholder.markdown(full_response + "▌")
-                            
-                    response_placeholder.markdown(full_response)
-                    
-                    st.session_state.chat_history.append({"role": "assistant", "content": full_response})
-                    
-                except Exception as e:
-                    print(traceback.format_exc())  # Print full traceback to console
-                    st.error(f"Error: {type(e).__name__}: {e}")
+                st.session_state.chat_history.append({"role": "assistant", "content": full_response})
+                # Older turns are folded into the summary off the request path.
+                memory.add_turn(prompt, full_response)
+                st.session_state.last_turn_timing = turn.timing
+                record_turn_metrics(turn.timing)
                 
-                finally:
-                    time.sleep(2)  # Keep speaking avatar visible for 2 seconds after response
-                    avatar_placeholder.image("idle.png", use_container_width=True)
+            except SchedulerBusy as e:
+                st.warning(str(e))
+            except Exception as e:
+                print(traceback.format_exc())  # Print full traceback to console
+                st.error(f"Error: {type(e).__name__}: {e}")
+
+    if os.getenv("IKI_DEBUG"):
+        stats = get_answer_cache().stats()
+        st.caption(
+            f"Answer cache: {stats['hits']} hits / {stats['misses']} misses "
+            f"({stats['hit_rate']:.0%}), {stats['entries']} entries"
+        )
+        scheduler = get_llm_scheduler().stats()
+        st.caption(
+            f"LLM scheduler: {scheduler['active']} active, {scheduler['queued']} queued, "
+            f"{scheduler['upstream_calls']} calls, {scheduler['coalesced']} coalesced, "
+            f"{scheduler['retries']} retries ({scheduler['rate_limited']} rate limited), {scheduler['rejected']} rejected"
+        )
+        timing = st.session_state.get('last_turn_timing')
+        if timing and timing['total_ms'] is not None:
+            st.caption(
+                f"Last answer: first token {timing['ttft_ms'] or 0:.0f} ms, total {timing['total_ms']:.0f} ms"
+                f"{' (condensed)' if timing['condensed'] else ''}{' (cached)' if timing['cached'] else ''}"
+            )
+        history = get_chat_memory().stats()
+        if history['full_tokens']:
+            st.caption(
+                f"History: {history['turns']} turns ({history['summarized_turns']} summarized), "
+                f"~{history['sent_tokens']} of {history['full_tokens']} tokens sent "
+                f"({history['saved_ratio']:.0%} saved)"
+            )
+
+def record_turn_metrics(timing):
+    if timing['condensed']:
+        metrics.observe("rag.condense", timing['condense_ms'])
+    if not timing['cached']:
+        metrics.observe("rag.retrieval", timing['retrieval_ms'])
+    metrics.observe("llm.ttft_cached" if timing['cached'] else "llm.ttft", timing['ttft_ms'])
+    metrics.observe("rag.total", timing['total_ms'])
+
+def record_history_metrics(history_tokens):
+    metrics.increment("chat_history_tokens_full", history_tokens['full_tokens'])
+    metrics.increment("chat_history_tokens_sent", history_tokens['sent_tokens'])
+
+def render_metrics_panel():
+    """Sidebar table of this run's phase timings and the process-wide histograms (IKI_DEBUG only)"""
+    if not (metrics.ENABLED and os.getenv("IKI_DEBUG")):
+        return
+    with st.sidebar.expander("Performance"):
+        spans = metrics.REGISTRY.run_spans()
+        if spans:
+            st.caption("This run")
+            st.dataframe([{"phase": name, "ms": round(ms, 1)} for name, ms in spans], hide_index=True)
+        st.caption("Since server start")
+        st.dataframe(
+            [{"phase": name, "count": s['count'], "mean ms": round(s['mean_ms'], 1),
+              "p50 ms ≤": s['p50_ms'], "p95 ms ≤": s['p95_ms'], "max ms": round(s['max_ms'], 1)}
+             for name, s in metrics.REGISTRY.summaries().items()],
+            hide_index=True,
+        )
+        counters = metrics.REGISTRY.counter_values()
+        if counters:
+            st.dataframe([{"counter": name, "value": value} for name, value in counters.items()], hide_index=True)
+
+def _format_clock(minutes, start_hour):
+    total = int(round(start_hour * 60 + minutes))
+    return f"{total // 60 % 24:02d}:{total % 60:02d}"
+
+def get_itinerary(catalog):
+    """(plan, plan_ms) for this session's day plan on the current spot data, or None"""
+    request = st.session_state.get('itinerary_request')
+    if not request:
+        return None
+    cached = st.session_state.get('itinerary')
+    # Replanning takes milliseconds, but only happens when the spot data changed.
+    if cached is None or cached[0] != catalog.spots_digest:
+        started = time.perf_counter()
+        with metrics.span("itinerary.plan"):
+            plan = plan_route(get_distance_matrix(catalog), request['ids'], request['minutes'])
+        cached = st.session_state.itinerary = (catalog.spots_digest, plan, (time.perf_counter() - started) * 1000)
+    return cached[1], cached[2]
+
+@st.fragment
+def render_day_planner(catalog):
+    """"Plan my day" controls; picking spots reruns only this fragment, planning reruns the page for the map"""
+    st.markdown("### Plan my day")
+    query = st.text_input("Find spots to visit", key="plan_query", placeholder="Shrines, beaches, sunset...")
+    picked = st.session_state.get('plan_spots', [])
+    matches = get_search_index(catalog).search(query)[0][:PLANNER_OPTION_LIMIT] if query.strip() else []
+    # Options are the picked spots and the current matches, never the whole catalogue.
+    options = list(dict.fromkeys(picked + [spot.get('id') for spot in matches]))
+    st.multiselect("Spots to visit (leave empty to use a category)", options,
+                   format_func=lambda spot_id: (catalog.get(spot_id) or {}).get('name', spot_id), key="plan_spots")
+    with st.form("day_planner"):
+        category_col, hours_col, start_col = st.columns(3)
+        with category_col:
+            category = st.selectbox("Category", ['All'] + catalog.categories, key="plan_category")
+        with hours_col:
+            hours = st.slider("Time available (hours)", 1.0, 12.0, 6.0, 0.5, key="plan_hours")
+        with start_col:
+            start_hour = st.slider("Start time", 6, 14, 9, key="plan_start_hour")
+        submitted = st.form_submit_button("Plan route")
+
+    if submitted:
+        picked = st.session_state.get('plan_spots', [])
+        if picked:
+            candidates = picked
+        else:
+            candidates = [spot.get('id') for spot in catalog.in_category(category)]
+        st.session_state.itinerary_request = {'ids': candidates, 'minutes': hours * 60, 'start_hour': start_hour}
+        st.session_state.pop('itinerary', None)
+        # The map is a separate fragment; a full rerun draws the new route on it.
+        st.rerun()
+
+    planned = get_itinerary(catalog)
+    if planned is None:
+        return
+    plan, plan_ms = planned
+    request = st.session_state.itinerary_request
+    if not plan.stops:
+        if plan.skipped:
+            st.info(f"None of those spots fit in {request['minutes'] / 60:g} hours; try allowing more time.")
+        else:
+            st.info("None of those spots have map coordinates to plan a route with.")
+        return
+    for n, stop in enumerate(plan.stops, start=1):
+        leg = f" — {stop.leg_km:.1f} km from the previous stop" if n > 1 else ""
+        st.markdown(
+            f"**{n}. {stop.spot.get('name', '')}** "
+            f"{_format_clock(stop.arrive_min, request['start_hour'])}–{_format_clock(stop.leave_min, request['start_hour'])}{leg}"
+        )
+    st.caption(
+        f"{len(plan.stops)} stops, about {plan.total_km:.1f} km ({plan.travel_min:.0f} min travel, "
+        f"{plan.visit_min:.0f} min visiting)"
+        + (f"; {len(plan.skipped)} spots didn't fit" if plan.skipped else "")
+        + (f" · planned in {plan_ms:.0f} ms" if os.getenv("IKI_DEBUG") else "")
+    )
+
+def _submit_review(spot_id, review_key):
+    new_review = st.session_state.get(review_key, '')
+    if new_review.strip():
+        add_review(spot_id, new_review)
+        st.session_state[review_key] = ''
+        st.session_state[f"review_flash_{spot_id}"] = ("success", "Review saved!")
+        st.session_state[f"reviews_page_{spot_id}"] = 0
+    else:
+        st.session_state[f"review_flash_{spot_id}"] = ("warning", "Please write something before submitting.")
+
+def _set_page(key, page):
+    st.session_state[key] = page
+
+def _set_category(category):
+    st.session_state.active_category = category
+    st.session_state.spot_page = 0
+
+def _page_controls(page, page_count, key):
+    """Previous / page n of m / next row that stores the chosen page in st.session_state[key]"""
+    prev_col, label_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        st.button("←", key=f"{key}_prev", disabled=page <= 0, on_click=_set_page, args=(key, page - 1),
+                  use_container_width=True)
+    with label_col:
+        st.markdown(f"<p style='text-align: center;'>Page {page + 1} of {page_count}</p>", unsafe_allow_html=True)
+    with next_col:
+        st.button("→", key=f"{key}_next", disabled=page >= page_count - 1, on_click=_set_page, args=(key, page + 1),
+                  use_container_width=True)
+
+def render_review_summary(spot, stats):
+    """Review count, recency and digest from precomputed aggregates; never scans reviews"""
+    if not stats['count']:
+        return
+    parts = [f"{stats['count']} review{'s' if stats['count'] != 1 else ''}"]
+    if stats['recent']:
+        parts.append(f"{stats['recent']} in the last {RECENT_REVIEW_DAYS} days")
+    if stats['latest']:
+        parts.append(f"latest {stats['latest'][:10]}")
+    st.caption(" · ".join(parts))
+    digester = get_review_digester()
+    digest = digester.get(spot.get('id'))
+    if digest:
+        st.markdown(f"*What visitors say:* {digest}")
+    digester.refresh_if_stale(spot, stats)
+
+@st.fragment
+def render_reviews(spot_id):
+    """Review expander for one spot; reviews are only queried while it is open, a page at a time"""
+    store = get_spot_store()
+    count = store.review_count(spot_id)
+    expander = st.expander(f"User Reviews ({count})", key=f"reviews_{spot_id}", on_change="rerun")
+    if not getattr(expander, 'open', True):
+        return
+    with expander:
+        page_key = f"reviews_page_{spot_id}"
+        page_count = max(1, -(-count // REVIEWS_PAGE_SIZE))
+        page = min(st.session_state.get(page_key, 0), page_count - 1)
+        reviews = store.reviews_page(spot_id, page * REVIEWS_PAGE_SIZE, REVIEWS_PAGE_SIZE)
+        if reviews:
+            for review in reviews:
+                st.markdown(f"**{review.get('timestamp', 'Recent')}**")
+                st.info(review.get('content'))
+            if page_count > 1:
+                _page_controls(page, page_count, page_key)
+        else:
+            st.write("No reviews yet. Be the first to write one!")
+        
+        st.divider()
+        review_key = f"review_input_{spot_id}"
+        st.text_area("Write a review", key=review_key)
+        st.button(
+            "Submit Review",
+            key=f"submit_{spot_id}",
+            on_click=_submit_review,
+            args=(spot_id, review_key),
+        )
+        flash = st.session_state.pop(f"review_flash_{spot_id}", None)
+        if flash:
+            kind, message = flash
+            getattr(st, kind)(message)
+
+@st.fragment
+def _spot_browser():
+    """Search, facets, category buttons and the current page of cards; their reruns stay inside this fragment"""
+    catalog = get_spot_catalog()
+    categories = ['All'] + catalog.categories
 
-def render_tourist_content():
-    """Render the category filter and tourist spots grid"""
-    
-    tourist_spots = load_tourist_spots()
-    
-    
-    if 'active_category' not in st.session_state:
-        st.session_state.active_category = 'All'
-    
-    
-    categories = ['All'] + sorted(list(set(spot['category'] for spot in tourist_spots)))
-    
-    
     st.markdown("---")
+    st.markdown("### Find a Spot")
+
+    active_category = st.session_state.active_category
+    filters = {
+        'category': [] if active_category == 'All' else [active_category],
+        'month': st.session_state.get('facet_month', []),
+        'duration': st.session_state.get('facet_duration', []),
+    }
+    with metrics.span("search.query"):
+        filtered_spots, facet_counts = get_search_index(catalog).search(
+            st.session_state.get('spot_query', ''), filters
+        )
+
+    search_col, month_col, duration_col = st.columns([2, 1, 1])
+    with search_col:
+        st.text_input("Search", key="spot_query", placeholder="Shrines, beaches, sunset...",
+                      on_change=_set_page, args=('spot_page', 0))
+    with month_col:
+        month_counts = facet_counts['month']
+        st.multiselect(
+            "Best month", [m for m in MONTHS if m in month_counts or m in filters['month']],
+            key="facet_month", format_func=lambda m: f"{m} ({month_counts.get(m, 0)})",
+            on_change=_set_page, args=('spot_page', 0),
+        )
+    with duration_col:
+        duration_counts = facet_counts['duration']
+        st.multiselect(
+            "Duration", [label for _, label in DURATION_BUCKETS if label in duration_counts or label in filters['duration']],
+            key="facet_duration", format_func=lambda d: f"{d} ({duration_counts.get(d, 0)})",
+            on_change=_set_page, args=('spot_page', 0),
+        )
+
     st.markdown("### Explore by Category")
     
+    category_counts = facet_counts['category']
     cols = st.columns(len(categories))
     for idx, category in enumerate(categories):
+        count = sum(category_counts.values()) if category == 'All' else category_counts.get(category, 0)
         with cols[idx]:
-            if st.button(
-                category,
+            # A callback rather than st.rerun(): the click's own rerun stays inside this fragment.
+            st.button(
+                f"{category} ({count})",
                 key=f"cat_{category}",
                 use_container_width=True,
-                type="primary" if st.session_state.active_category == category else "secondary"
-            ):
-                st.session_state.active_category = category
+                type="primary" if st.session_state.active_category == category else "secondary",
+                on_click=_set_category, args=(category,),
+            )
     
     st.markdown("---")
-    
-    
-    filtered_spots = tourist_spots if st.session_state.active_category == 'All' else [
-        spot for spot in tourist_spots if spot['category'] == st.session_state.active_category
-    ]
 
     st.markdown("""
         <style>
@@ -243,18 +671,25 @@ def render_tourist_content():
     
     
     st.markdown("### Tourist Spots")
+
+    # Only the current page of cards is rendered, however large the category is.
+    page_count = max(1, -(-len(filtered_spots) // SPOTS_PAGE_SIZE))
+    page = min(st.session_state.get('spot_page', 0), page_count - 1)
+    page_start = page * SPOTS_PAGE_SIZE
+    page_spots = filtered_spots[page_start:page_start + SPOTS_PAGE_SIZE]
     
-    for i in range(0, len(filtered_spots), 3):
+    cards_started = time.perf_counter()
+    for i in range(0, len(page_spots), 3):
         cols = st.columns(3)
         for j in range(3):
-            if i + j < len(filtered_spots):
-                spot = filtered_spots[i + j]
+            if i + j < len(page_spots):
+                spot = page_spots[i + j]
                 with cols[j]:
                     with st.container(border=True):
     
                         st.markdown(f"""
                                     <div class="card-image">
-                                        <img src="{spot['imageUrl']}" />
+                                        <img src="{images.remote_image_url(spot['imageUrl'], 'card')}" loading="lazy" />
                                     </div>
                                     """,
                                     unsafe_allow_html=True
@@ -285,36 +720,46 @@ def render_tourist_content():
                         with st.expander("Highlights"):
                             for highlight in spot['highlights']:
                                 st.markdown(f"• {highlight}")
+
+                        nearby = get_spatial_index(catalog).near_spot(spot.get('id'), NEARBY_RADIUS_KM, limit=NEARBY_LIMIT)
+                        if nearby:
+                            with st.expander("Near this spot"):
+                                for other, distance_km in nearby:
+                                    st.markdown(f"• {other['name']} ({distance_km:.1f} km)")
                         
     
                         view_map_key = f"view_map_{spot.get('id', i+j)}"
                         if st.button("View on map", key=view_map_key, use_container_width=True):
                             st.session_state['map_center'] = spot.get('coordinates')
                             st.session_state['map_zoom'] = 15
+                            st.session_state.pop('spots_map_bounds', None)
                             st.session_state['scroll_to_map'] = True
                             st.rerun()
 
                         # User Reviews Section
-                        with st.expander("User Reviews"):
-                            reviews = spot.get('user_reviews', [])
-                            if reviews:
-                                for review in reviews:
-                                    st.markdown(f"**{review.get('timestamp', 'Recent')}**")
-                                    st.info(review.get('content'))
-                            else:
-                                st.write("No reviews yet. Be the first to write one!")
-                            
-                            st.divider()
-                            review_key = f"review_input_{spot.get('id')}"
-                            new_review = st.text_area("Write a review", key=review_key)
-                            if st.button("Submit Review", key=f"submit_{spot.get('id')}"):
-                                if new_review.strip():
-                                    add_review(spot.get('id'), new_review)
-                                    st.success("Review saved!")
-                                    time.sleep(1)
-                                    st.rerun()
-                                else:
-                                    st.warning("Please write something before submitting.")
+                        render_review_summary(spot, catalog.stats_for(spot.get('id')))
+                        render_reviews(spot.get('id'))
+    metrics.observe("cards.render", (time.perf_counter() - cards_started) * 1000)
+
+    if page_count > 1:
+        _page_controls(page, page_count, "spot_page")
+
+
+def render_tourist_content():
+    """Render the category filter and tourist spots grid"""
+    
+    catalog = get_spot_catalog()
+    tourist_spots = catalog.spots
+    
+    st.title(f"Discover {current_destination()}")
+    if not tourist_spots:
+        st.info(f"Tourist spots for {current_destination()} are coming soon.")
+        return
+    
+    if 'active_category' not in st.session_state:
+        st.session_state.active_category = 'All'
+
+    _spot_browser()
 
     
     st.markdown("""
@@ -373,33 +818,10 @@ def render_tourist_content():
 
     if tourist_spots:
 
-        default_center = tourist_spots[0].get('coordinates', [33.75, 129.69])
-        map_center = st.session_state.get('map_center', default_center)
-        map_zoom = st.session_state.get('map_zoom', 11)
-        
-        map_all = folium.Map(location=map_center, zoom_start=map_zoom, tiles="OpenStreetMap")
-
-        marker_cluster = MarkerCluster()
-        bounds = []
-        for spot in tourist_spots:
-            coords = spot.get('coordinates')
-            if coords and len(coords) >= 2:
-                popup_html = f"<b>{spot['name']}</b><br><img src=\"{spot.get('imageUrl')}\" style=\"width:180px;max-width:90%;height:auto;\"><br>{spot.get('shortDescription','')}"
-                folium.Marker(
-                    location=coords,
-                    popup=folium.Popup(popup_html, max_width=300),
-                    tooltip=spot['name']
-                ).add_to(marker_cluster)
-                bounds.append(coords)
-
-        marker_cluster.add_to(map_all)
-        
-        if 'map_center' not in st.session_state and bounds:
-             map_all.fit_bounds(bounds, padding=(30, 30))
-
         st.markdown("---")
+        render_day_planner(catalog)
         st.markdown("### See all locations on the map")
-        st_folium(map_all, width="100%", height=480)
+        render_spots_map(catalog)
     else:
         st.warning("No tourist spots found to display on the map.")
 
@@ -412,9 +834,39 @@ def main():
     st.title("Discover Iki Island")
     st.markdown("Explore the hidden treasures of Iki Island")
     
-    tourist_data = load_tourist_spots()
-    render_sidebar_chatbot(tourist_data)
+    render_sidebar_chatbot()
     render_tourist_content()
 
+def build_index_cli(argv):
+    """`python ikicontent.py build-index`: build the FAISS index ahead of deploy"""
+    import indexbuilder
+    parser = argparse.ArgumentParser(prog="python ikicontent.py build-index",
+                                     description="Embed every spot and publish a new FAISS index version")
+    parser.add_argument('--destination', default=DEFAULT_DESTINATION, choices=list(utils.LOCATIONS))
+    parser.add_argument('--data', help="tourist spots JSON file (default: the destination's shard)")
+    parser.add_argument('--local', action='store_true', help="use the offline hash embeddings (same as IKI_EMBEDDINGS=local)")
+    parser.add_argument('--index-path', help="index directory (default: the one the app loads)")
+    parser.add_argument('--batch-size', type=int, default=indexbuilder.DEFAULT_BATCH_SIZE)
+    parser.add_argument('--concurrency', type=int, default=indexbuilder.DEFAULT_CONCURRENCY)
+    parser.add_argument('--max-retries', type=int, default=indexbuilder.DEFAULT_MAX_RETRIES)
+    parser.add_argument('--keep-checkpoint', action='store_true', help="keep the per-batch checkpoint after success")
+    args = parser.parse_args(argv)
+    if args.local:
+        os.environ["IKI_EMBEDDINGS"] = "local"
+    destination = destination_paths(args.destination)
+    data_path = args.data or destination.json_path
+    if not os.path.isfile(data_path):
+        parser.error(f"no spot data for {args.destination} at {data_path}; pass --data with a tourist spots JSON file")
+    embeddings = embedding_client()
+    path = indexbuilder.build_index(
+        indexbuilder.iter_spots(data_path), embeddings,
+        args.index_path or vector_index_path(destination),
+        model_name=getattr(embeddings, 'model', EMBEDDING_MODEL), batch_size=args.batch_size,
+        concurrency=args.concurrency, max_retries=args.max_retries, keep_checkpoint=args.keep_checkpoint,
+    )
+    return 0 if path else 1
+
 if __name__ == "__main__":
+    if sys.argv[1:2] == ["build-index"]:
+        sys.exit(build_index_cli(sys.argv[2:]))
     main()
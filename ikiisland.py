@@ -1,10 +1,20 @@
+import time
 import streamlit as st
-import folium
-from streamlit_folium import st_folium
-import base64
+import images
+import utils
+import metrics
 import streamlit.components.v1 as components
-from ikicontent import render_tourist_content, render_sidebar_chatbot, load_tourist_spots
+from ikicontent import (render_tourist_content, render_sidebar_chatbot, warm_ai_guide, render_metrics_panel,
+                        SPOT_STATE_PREFIXES)
 st.set_page_config(page_title="Ikikae project -> App demo", layout="wide")
+run_started = time.perf_counter()
+metrics.start_run()
+
+
+def finish_run(page):
+    metrics.observe(f"run.{page}", (time.perf_counter() - run_started) * 1000)
+    render_metrics_panel()
+    metrics.finish_run()
 
 st.markdown("""
 <style>
@@ -114,6 +124,12 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+try:
+    warm_ai_guide()
+except Exception as e:
+    # The landing page works without the guide; the chatbot reports the error when opened.
+    print(f"AI guide warm-up skipped: {type(e).__name__}: {e}")
+
 if 'current_page' not in st.session_state:
     st.session_state.current_page = 'main'
 
@@ -122,9 +138,11 @@ if st.session_state.current_page == 'ikicontent':
         st.session_state.current_page = 'main'
         st.rerun()
     
-    tourist_data = load_tourist_spots()
-    render_sidebar_chatbot(tourist_data)
-    render_tourist_content()
+    with metrics.span("page.chatbot"):
+        render_sidebar_chatbot()
+    with metrics.span("page.tourist_content"):
+        render_tourist_content()
+    finish_run('ikicontent')
     st.stop()
 
 def scroll_to(target_id):
@@ -158,17 +176,67 @@ with c2:
         if st.button("ABOUT PROJECT", use_container_width=True):
             st.session_state.show_about = not st.session_state.show_about
 
+def submit_rating():
+    utils.submit_rating(
+        st.session_state.rating_user or "Anonymous",
+        st.session_state.rating_location,
+        st.session_state.rating_score,
+        st.session_state.rating_comment,
+    )
+    st.session_state.rating_comment = ""
+
+def render_rating_stats():
+    store = utils.get_ratings_store()
+    summary = store.summary()
+    if utils.SYNTHETIC_RATINGS:
+        st.warning(f"Demo data: these statistics include {utils.SYNTHETIC_RATINGS:,} generated ratings "
+                   "(IKI_SYNTHETIC_RATINGS).")
+    m1, m2 = st.columns(2)
+    m1.metric("Ratings", f"{summary['count']:,}")
+    m2.metric("Average score", f"{summary['mean']:.2f} / 5" if summary['mean'] else "-")
+
+    st.dataframe(
+        [{"Destination": row['location'], "Ratings": row['count'],
+          "Average": round(row['mean'], 2) if row['mean'] else None} for row in store.by_location()],
+        hide_index=True, use_container_width=True,
+    )
+    if summary['count']:
+        location = st.selectbox("Destination", ["All destinations"] + list(utils.LOCATIONS), key="stats_location")
+        location = None if location == "All destinations" else location
+        month_col, score_col = st.columns(2)
+        with month_col:
+            st.caption("Average score by month")
+            st.line_chart({row['month']: row['mean'] for row in store.by_month(location)})
+        with score_col:
+            st.caption("Score distribution")
+            st.bar_chart({f"{score}★": count for score, count in store.histogram(location).items()})
+    else:
+        st.caption("No ratings yet. Be the first to rate a destination below.")
+
+    with st.form("rating_form", clear_on_submit=False):
+        st.markdown("**Rate a destination**")
+        st.text_input("Name", key="rating_user")
+        st.selectbox("Destination", list(utils.LOCATIONS), key="rating_location")
+        st.slider("Score", 1, 5, 5, key="rating_score")
+        st.text_input("Comment", key="rating_comment")
+        st.form_submit_button("Submit rating", on_click=submit_rating)
+
 if st.session_state.show_about:
     st.divider()
     st.info("### About the Project")
     st.write("Explanation about the project and how it works...")
     st.write("Here are the statistics and form results.")
+    with metrics.span("about.rating_stats"):
+        render_rating_stats()
 
 st.divider()
 st.markdown("<h2 style='text-align: center;'>Explore the Map</h2>", unsafe_allow_html=True)
 
 
 #MAP STUFF
+# Imported here rather than at the top so everything above paints first.
+import folium
+from streamlit_folium import st_folium
 iki_lat = 33.7492
 iki_lon = 129.6914
 m = folium.Map(
@@ -176,18 +244,15 @@ m = folium.Map(
     zoom_start=6,
     tiles="OpenStreetMap"
 )
-placeholder_image_path = "/Users/niwatorimostiqo/.gemini/antigravity/brain/86904a5a-a2c9-4e4e-9a58-551f7b5ba493/iki_island_placeholder_1767502986414.png"
-try:
-    with open(placeholder_image_path, "rb") as img_file:
-        img_data = base64.b64encode(img_file.read()).decode()
-    
+iki_image_url = images.image_url(utils.LOCATIONS["Iki Island"]["image"], 'thumb', absolute=True)
+if iki_image_url:
     popup_html = f"""
     <div style="width: 200px; text-align: center;">
         <h3 style="margin: 5px 0;">Iki Island</h3>
-        <img src="data:image/png;base64,{img_data}" style="width: 180px; height: auto; margin-top: 10px;">
+        <img src="{iki_image_url}" style="width: 180px; height: auto; margin-top: 10px;">
     </div>
     """
-except FileNotFoundError:
+else:
     popup_html = """
     <div style="width: 200px; text-align: center;">
         <h3 style="margin: 5px 0;">Iki Island</h3>
@@ -202,7 +267,7 @@ folium.Marker(
 ).add_to(m)
 # Centering the map using columns
 c_map1, c_map2, c_map3 = st.columns([1, 8, 1])
-with c_map2:
+with c_map2, metrics.span("landing.st_folium"):
     st_folium(m, width=900, height=500)
 
 
@@ -215,19 +280,32 @@ st.write("Locations are as follows")
 if 'current_page' not in st.session_state:
     st.session_state.current_page = 'main'
 
-c3, c4, c5 = st.columns(3)
-
-with c3:
-    # Create a clickable card using a container and button
-    with st.container(border=True):
-        st.markdown("### Iki Island")
-        st.write("Discover the hidden treasures of Iki Island")
-        st.image("https://images.unsplash.com/photo-1633703384611-41eb774a6d3b?w=400", use_container_width=True)
-        
-        if st.button("Explore Iki Island", key="explore_iki", use_container_width=True, type="primary"):
-            st.session_state.current_page = 'ikicontent'
-            st.rerun()
+def open_destination(name):
+    st.session_state.destination = name
+    st.session_state.current_page = 'ikicontent'
+    # Filters and pages belong to the previous destination.
+    for key in ('active_category', 'spot_page', 'spot_query', 'facet_month', 'facet_duration',
+                'map_center', 'map_zoom', 'spots_map_bounds', 'spots_map_viewport', 'spots_map_seen',
+                'chat_history', 'chat_memory', 'itinerary', 'itinerary_request', 'plan_query', 'plan_spots', 'plan_category'):
+        st.session_state.pop(key, None)
+    # Spot ids start at 1 in every destination, so per-spot review drafts and pages would carry over.
+    for key in [k for k in st.session_state if k.startswith(SPOT_STATE_PREFIXES)]:
+        st.session_state.pop(key, None)
 
+destination_cols = st.columns(len(utils.LOCATIONS))
 
+for col, (name, location) in zip(destination_cols, utils.LOCATIONS.items()):
+    with col:
+        # Create a clickable card using a container and button
+        with st.container(border=True):
+            st.markdown(f"### {name}")
+            st.write(location["description"])
+            card_image = images.image_url(location["image"], 'card')
+            if card_image:
+                st.markdown(f'<img src="{card_image}" loading="lazy" style="width: 100%; border-radius: 12px;" />',
+                            unsafe_allow_html=True)
 
+            st.button(f"Explore {name}", key=f"explore_{name}", use_container_width=True, type="primary",
+                      on_click=open_destination, args=(name,))
 
+finish_run('main')
@@ -0,0 +1,121 @@
+import argparse
+import glob
+import hashlib
+import os
+import threading
+from urllib.parse import urlencode, urlparse, parse_qsl, urlunparse
+
+try:
+    from PIL import Image
+except Exception:
+    Image = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DERIVED_DIR = os.path.join(STATIC_DIR, 'derived')
+# Streamlit serves ./static at app/static when server.enableStaticServing is on.
+STATIC_URL = 'app/static'
+
+# size name -> (max width in px, format, quality)
+DERIVATIVES = {
+    'thumb': (320, 'WEBP', 70),
+    'card': (640, 'WEBP', 78),
+    'hero': (1920, 'JPEG', 82),
+}
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+# Hosts that resize on request via query parameters (imgix-style).
+RESIZING_HOSTS = {'images.unsplash.com'}
+SOURCE_GLOBS = ['assets/*.png', '*.png']
+
+_hash_cache = {}
+_lock = threading.Lock()
+
+
+def source_hash(path):
+    """sha256 of the file contents, memoised on (path, mtime, size)"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        cached = _hash_cache.get(key)
+    if cached is None:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        cached = digest.hexdigest()
+        with _lock:
+            _hash_cache[key] = cached
+    return cached
+
+def derivative_name(path, size):
+    _, fmt, _ = DERIVATIVES[size]
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{stem}-{size}-{source_hash(path)[:16]}.{EXTENSIONS[fmt]}"
+
+def ensure_derivative(path, size):
+    """Create the resized copy of a local image if needed; returns its file path, or None without Pillow"""
+    if Image is None:
+        return None
+    target = os.path.join(DERIVED_DIR, derivative_name(path, size))
+    if os.path.exists(target):
+        return target
+    width, fmt, quality = DERIVATIVES[size]
+    os.makedirs(DERIVED_DIR, exist_ok=True)
+    with Image.open(path) as img:
+        img.thumbnail((width, width * 4))
+        if fmt == 'JPEG' and img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+        tmp = f"{target}.{os.getpid()}.tmp"
+        img.save(tmp, fmt, quality=quality, optimize=True)
+    os.replace(tmp, target)
+    return target
+
+def image_url(path, size, absolute=False):
+    """Static URL of a local image's derivative, or None if it can't be produced.
+
+    Names are content-addressed, so a URL never changes meaning and the
+    browser can keep it cached. Pass absolute=True for HTML rendered inside
+    component iframes (such as folium popups).
+    """
+    if not os.path.isabs(path):
+        path = os.path.join(BASE_DIR, path)
+    try:
+        target = ensure_derivative(path, size)
+    except (OSError, ValueError):
+        return None
+    if target is None:
+        return None
+    url = f"{STATIC_URL}/derived/{os.path.basename(target)}"
+    return f"/{url}" if absolute else url
+
+def remote_image_url(url, size):
+    """Ask resizing CDNs for a `size`-sized rendition instead of the original"""
+    if not url:
+        return url
+    parsed = urlparse(url)
+    if parsed.hostname not in RESIZING_HOSTS:
+        return url
+    width, _, quality = DERIVATIVES[size]
+    query = dict(parse_qsl(parsed.query, keep_blank_values=True))
+    query.update({'w': str(width), 'q': str(quality), 'auto': 'format'})
+    query.pop('fm', None)
+    return urlunparse(parsed._replace(query=urlencode(query)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-build resized image derivatives into static/derived")
+    parser.add_argument('paths', nargs='*', help="images to process (default: assets/*.png and *.png)")
+    parser.add_argument('--sizes', nargs='+', default=list(DERIVATIVES), choices=list(DERIVATIVES))
+    args = parser.parse_args(argv)
+    if Image is None:
+        parser.error("Pillow is required: pip install pillow")
+    paths = args.paths or sorted({p for pattern in SOURCE_GLOBS for p in glob.glob(os.path.join(BASE_DIR, pattern))})
+    for path in paths:
+        for size in args.sizes:
+            target = ensure_derivative(path, size)
+            print(f"{os.path.relpath(path, BASE_DIR)} [{size}] -> {os.path.relpath(target, BASE_DIR)} "
+                  f"({os.path.getsize(path) // 1024} KB -> {os.path.getsize(target) // 1024} KB)")
+
+
+if __name__ == "__main__":
+    main()
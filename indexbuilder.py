@@ -0,0 +1,151 @@
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from embedcache import EmbeddingCache
+from ratelimit import backoff_delay, is_rate_limited
+from spotindex import IndexDirectory, _require_langchain, content_hash, spot_document_text, spot_key
+
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_RETRIES = 6
+CHECKPOINT_NAME = 'build-checkpoint.db'
+READ_CHUNK = 1 << 16
+
+
+def iter_spots(path, chunk_size=READ_CHUNK):
+    """Yield the spots of a JSON array file one at a time, without loading the whole file"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf, pos, eof, started = '', 0, False, False
+
+        def fill():
+            nonlocal buf, pos, eof
+            data = f.read(chunk_size)
+            if data:
+                buf, pos = buf[pos:] + data, 0
+            else:
+                eof = True
+
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    raise ValueError(f"{path}: unexpected end of file")
+                fill()
+                continue
+            if not started:
+                if buf[pos] != '[':
+                    raise ValueError(f"{path}: expected a JSON array of spots")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == ']':
+                return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            pos = end
+            yield item
+
+def embed_with_retry(embeddings, texts, max_retries=DEFAULT_MAX_RETRIES, log=print):
+    """embed_documents with exponential backoff and jitter; rate limits back off twice as long"""
+    for attempt in range(max_retries + 1):
+        try:
+            return embeddings.embed_documents(texts)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff_delay(attempt, is_rate_limited(e))
+            log(f"Batch of {len(texts)} failed ({type(e).__name__}: {e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_index(spots, embeddings, index_path, model_name, batch_size=DEFAULT_BATCH_SIZE,
+                concurrency=DEFAULT_CONCURRENCY, max_retries=DEFAULT_MAX_RETRIES, keep_checkpoint=False, log=print):
+    """Embed `spots` in batches and publish them as a new FAISS index version under `index_path`.
+
+    Every finished batch is written to a checkpoint database next to the
+    index, so rerunning after an interruption only embeds what is missing.
+    The manifest matches spotindex.sync_vector_store, so the app treats the
+    result as up to date.
+    """
+    FAISS, _ = _require_langchain()
+    os.makedirs(index_path, exist_ok=True)
+    checkpoint_path = os.path.join(index_path, CHECKPOINT_NAME)
+    checkpoint = EmbeddingCache(checkpoint_path, max_entries=None)
+
+    documents = {}
+    resumed = embedded = 0
+    pending = set()
+
+    def collect(done):
+        nonlocal embedded
+        for future in done:
+            pending.discard(future)
+            embedded += future.result()
+
+    def run_batch(texts):
+        vectors = embed_with_retry(embeddings, texts, max_retries, log)
+        checkpoint.put_many(model_name, texts, vectors)
+        return len(texts)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="index-build") as pool:
+        for batch in _batches(spots, batch_size):
+            texts = []
+            for item in batch:
+                text = spot_document_text(item)
+                documents[spot_key(item)] = (item.get('name'), text)
+                texts.append(text)
+            cached = checkpoint.get_many(model_name, texts)
+            todo = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+            resumed += len(texts) - len(todo)
+            if not todo:
+                continue
+            # Bound how far reading runs ahead of the embedding workers.
+            while len(pending) >= concurrency * 2:
+                collect(wait(pending, return_when=FIRST_COMPLETED).done)
+            pending.add(pool.submit(run_batch, todo))
+            log(f"Queued {len(documents)} spots ({embedded} embedded, {resumed} from checkpoint)")
+        collect(wait(pending).done)
+
+    if not documents:
+        log("No spots to index")
+        return None
+    keys = list(documents)
+    texts = [documents[key][1] for key in keys]
+    vectors = checkpoint.get_many(model_name, texts)
+    store = FAISS.from_embeddings(
+        list(zip(texts, vectors)), embeddings,
+        metadatas=[{"name": documents[key][0]} for key in keys], ids=keys,
+    )
+    manifest = {"version": 1, "documents": {
+        key: {"hash": content_hash(text), "doc_id": key} for key, text in zip(keys, texts)
+    }}
+    path = IndexDirectory(index_path).publish(store, manifest)
+    log(f"Indexed {len(keys)} spots ({embedded} embedded, {resumed} from checkpoint) "
+        f"in {time.perf_counter() - started:.1f}s -> {path}")
+    if not keep_checkpoint:
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(checkpoint_path + suffix)
+            except FileNotFoundError:
+                pass
+    return path
@@ -0,0 +1,158 @@
+from collections import namedtuple
+
+import numpy as np
+
+from geo import haversine_km
+from search import duration_range
+
+# Full matrices above this many spots would take more than ~16 MB (float32);
+# bigger catalogues compute the candidates' sub-matrix per plan instead.
+MAX_CACHED_SPOTS = 2000
+DEFAULT_SPEED_KMH = 30.0
+# Road distance is longer than the great-circle distance.
+DETOUR_FACTOR = 1.3
+DEFAULT_VISIT_MINUTES = 60
+MAX_2OPT_PASSES = 50
+
+Stop = namedtuple('Stop', ['spot', 'arrive_min', 'leave_min', 'leg_km'])
+Itinerary = namedtuple('Itinerary', ['stops', 'total_km', 'travel_min', 'visit_min', 'skipped'])
+
+
+def visit_minutes(duration, default=DEFAULT_VISIT_MINUTES):
+    """Midpoint of a `duration` string like '1.5-3 hours', '45 min' or 'Half day', in minutes"""
+    found = duration_range(duration)
+    return default if found is None else sum(found) / 2
+
+
+class DistanceMatrix:
+    """Pairwise great-circle distances (km) between spots, built once per spot-data version.
+
+    The matrix is computed in one vectorized haversine call; catalogues
+    larger than `max_cached` keep only the coordinates and compute the
+    sub-matrix of each plan's candidates on demand.
+    """
+
+    def __init__(self, spots, max_cached=MAX_CACHED_SPOTS):
+        self.spots = [s for s in spots if s.get('coordinates') and len(s['coordinates']) >= 2]
+        coords = np.array([s['coordinates'][:2] for s in self.spots], dtype=np.float64).reshape(-1, 2)
+        self.lats = coords[:, 0]
+        self.lons = coords[:, 1]
+        self.position_by_id = {s.get('id'): i for i, s in enumerate(self.spots)}
+        self.km = self._pairwise(np.arange(len(self.spots))) if len(self.spots) <= max_cached else None
+
+    def __len__(self):
+        return len(self.spots)
+
+    def _pairwise(self, positions):
+        lats, lons = self.lats[positions], self.lons[positions]
+        return haversine_km(lats[:, None], lons[:, None], lats[None, :], lons[None, :]).astype(np.float32)
+
+    def positions(self, spot_ids):
+        return [self.position_by_id[i] for i in spot_ids if i in self.position_by_id]
+
+    def sub(self, positions):
+        """Distance matrix between the given spot positions, in that order"""
+        positions = np.asarray(positions, dtype=np.intp)
+        if self.km is not None:
+            return self.km[np.ix_(positions, positions)]
+        return self._pairwise(positions)
+
+
+def _path_length(dist, order):
+    return float(dist[order[:-1], order[1:]].sum()) if len(order) > 1 else 0.0
+
+def two_opt(dist, order, max_passes=MAX_2OPT_PASSES):
+    """Improve an open path with a fixed first stop by reversing segments while it gets shorter"""
+    order = np.asarray(order, dtype=np.intp)
+    n = len(order)
+    if n < 4:
+        return order
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            # Reverse order[i:j+1] for every j at once: edges (i-1, i) and (j, j+1) are replaced.
+            a, b = order[i - 1], order[i]
+            js = np.arange(i + 1, n)
+            c = order[js]
+            d = np.append(order[js[:-1] + 1], -1)
+            after = np.where(d >= 0, dist[c, np.maximum(d, 0)], 0.0)
+            new_after = np.where(d >= 0, dist[b, np.maximum(d, 0)], 0.0)
+            delta = dist[a, c] + new_after - dist[a, b] - after
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-9:
+                j = js[best]
+                order[i:j + 1] = order[i:j + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+    return order
+
+
+def plan_route(matrix, candidate_ids, budget_minutes, start_id=None, speed_kmh=DEFAULT_SPEED_KMH):
+    """Ordered day route through as many candidates as fit in `budget_minutes`.
+
+    Nearest-neighbour from the first candidate whose visit fits the budget
+    (`start_id` is tried first if given) picks stops while travel plus visit
+    time fits the budget; 2-opt then shortens the path, and the time it
+    frees is used to insert skipped candidates at their cheapest position.
+    """
+    ids = list(dict.fromkeys(candidate_ids))
+    if start_id is not None:
+        ids = [start_id] + [i for i in ids if i != start_id]
+    positions = matrix.positions(ids)
+    if not positions:
+        return Itinerary([], 0.0, 0.0, 0.0, [])
+    spots = [matrix.spots[p] for p in positions]
+    dist = matrix.sub(positions).astype(np.float64) * DETOUR_FACTOR
+    minutes_per_km = 60.0 / speed_kmh
+    visit = np.array([visit_minutes(s.get('duration')) for s in spots])
+    n = len(spots)
+
+    # Spots whose visit alone exceeds the budget can never be routed; start at the first one that fits.
+    unvisited = visit <= budget_minutes
+    if not unvisited.any():
+        return Itinerary([], 0.0, 0.0, 0.0, spots)
+    first = int(np.argmax(unvisited))
+    order = [first]
+    used = visit[first]
+    unvisited[first] = False
+    while unvisited.any():
+        legs = dist[order[-1]] * minutes_per_km
+        cost = np.where(unvisited, legs + visit, np.inf)
+        nxt = int(np.argmin(np.where(used + cost <= budget_minutes, legs, np.inf)))
+        if not np.isfinite(cost[nxt]) or used + cost[nxt] > budget_minutes:
+            break
+        order.append(nxt)
+        used += cost[nxt]
+        unvisited[nxt] = False
+
+    order = two_opt(dist, order)
+    order = _insert_skipped(dist, order, unvisited, visit, minutes_per_km, budget_minutes)
+
+    stops = []
+    clock = 0.0
+    total_km = 0.0
+    for k, p in enumerate(order):
+        leg = float(dist[order[k - 1], p]) if k else 0.0
+        total_km += leg
+        clock += leg * minutes_per_km
+        stops.append(Stop(spots[p], clock, clock + visit[p], leg))
+        clock += visit[p]
+    visit_total = float(visit[order].sum())
+    routed = set(order.tolist())
+    skipped = [spots[p] for p in range(n) if p not in routed]
+    return Itinerary(stops, total_km, total_km * minutes_per_km, visit_total, skipped)
+
+def _insert_skipped(dist, order, unvisited, visit, minutes_per_km, budget_minutes):
+    order = list(order)
+    used = _path_length(dist, order) * minutes_per_km + visit[order].sum()
+    for p in np.flatnonzero(unvisited):
+        o = np.asarray(order)
+        # Extra travel for inserting p after each stop (appending at the end has no outgoing edge).
+        extra = dist[o, p] + np.append(dist[p, o[1:]] - dist[o[:-1], o[1:]], 0.0)
+        k = int(np.argmin(extra))
+        added = extra[k] * minutes_per_km + visit[p]
+        if used + added <= budget_minutes:
+            order.insert(k + 1, int(p))
+            used += added
+    return np.asarray(order, dtype=np.intp)
@@ -0,0 +1,266 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+import metrics
+# Not indexbuilder: it pulls in embedcache and langchain_core, which the landing page must not wait for.
+from ratelimit import backoff_delay, is_rate_limited
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_QUEUE = 64
+DEFAULT_QUEUE_TIMEOUT = 60.0
+DEFAULT_MAX_RETRIES = 4
+BACKGROUND_SESSION = 'background'
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError)
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerBusy(RuntimeError):
+    """Raised when a request can't get an LLM slot (queue full or wait timed out)"""
+
+
+class FairLimiter:
+    """Counting semaphore whose waiters are served round-robin by session.
+
+    A session that queues many requests only gets every n-th free slot when
+    n sessions are waiting, so one busy tab can't starve the others.
+    """
+
+    def __init__(self, limit, max_queue=DEFAULT_MAX_QUEUE):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self._queues = OrderedDict()  # session -> deque of waiter events
+        self._lock = threading.Lock()
+
+    def acquire(self, session, timeout=None):
+        with self._lock:
+            if self.active < self.limit and not self._queues:
+                self.active += 1
+                return
+            if self.waiting >= self.max_queue:
+                raise SchedulerBusy("The AI guide is busy right now; please try again in a moment.")
+            waiter = threading.Event()
+            self._queues.setdefault(session, deque()).append(waiter)
+            self.waiting += 1
+        if waiter.wait(timeout):
+            return
+        with self._lock:
+            # The slot may have been handed over just as the wait timed out.
+            if waiter.is_set():
+                return
+            waiters = self._queues.get(session)
+            waiters.remove(waiter)
+            if not waiters:
+                del self._queues[session]
+            self.waiting -= 1
+        raise SchedulerBusy("The AI guide is busy right now; please try again in a moment.")
+
+    def release(self):
+        with self._lock:
+            if not self._queues:
+                self.active -= 1
+                return
+            session, waiters = next(iter(self._queues.items()))
+            waiter = waiters.popleft()
+            # The served session moves to the back of the line.
+            del self._queues[session]
+            if waiters:
+                self._queues[session] = waiters
+            self.waiting -= 1
+            waiter.set()  # the slot passes straight to the waiter
+
+
+class _Flight:
+    """One upstream call whose chunks are replayed to every request that joined it"""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self._cond = threading.Condition()
+
+    def push(self, chunk):
+        with self._cond:
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.error = error
+            self.done = True
+            self._cond.notify_all()
+
+    def __iter__(self):
+        i = 0
+        while True:
+            with self._cond:
+                while i >= len(self.chunks) and not self.done:
+                    self._cond.wait()
+                if i < len(self.chunks):
+                    chunk = self.chunks[i]
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            i += 1
+            yield chunk
+
+    def result(self):
+        for chunk in self:
+            return chunk
+
+
+class LLMScheduler:
+    """Process-wide admission control in front of the LLM and embedding clients.
+
+    At most `concurrency` upstream calls run at once; further requests wait
+    in a FairLimiter queue. Rate-limit errors pause every caller with
+    exponential backoff (a shared cooldown), and requests identical to one
+    already in flight join it instead of making another upstream call -
+    streamed chunks fan out to every joined request.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, max_queue=DEFAULT_MAX_QUEUE,
+                 queue_timeout=DEFAULT_QUEUE_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES):
+        self.limiter = FairLimiter(concurrency, max_queue)
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._cooldown_until = 0.0
+        self.counts = {'upstream_calls': 0, 'coalesced': 0, 'retries': 0, 'rate_limited': 0, 'rejected': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+        metrics.increment(f"llm_scheduler_{name}")
+
+    def invoke(self, key, call, session=None):
+        """Result of `call()`, shared with any identical request already in flight"""
+        flight, leader = self._join(key)
+        if leader:
+            self._run(key, flight, lambda: [call()], session)
+        return flight.result()
+
+    def stream(self, key, call, session=None):
+        """Chunks of the iterable returned by `call()`; the upstream stream runs on its own thread"""
+        flight, leader = self._join(key)
+        if leader:
+            threading.Thread(target=self._run, args=(key, flight, call, session),
+                             name="llm-stream", daemon=True).start()
+        return iter(flight)
+
+    def _join(self, key):
+        with self._lock:
+            flight = self._in_flight.get(key)
+            if flight is not None:
+                self.counts['coalesced'] += 1
+                metrics.increment("llm_scheduler_coalesced")
+                return flight, False
+            flight = self._in_flight[key] = _Flight()
+            return flight, True
+
+    def _run(self, key, flight, call, session):
+        error = None
+        try:
+            queued = time.perf_counter()
+            self.limiter.acquire(session or BACKGROUND_SESSION, self.queue_timeout)
+        except SchedulerBusy as e:
+            self._count('rejected')
+            self._finish(key, flight, e)
+            return
+        try:
+            metrics.observe("llm.queue_wait", (time.perf_counter() - queued) * 1000)
+            self._call_with_backoff(flight, call)
+        except Exception as e:
+            error = e
+        finally:
+            self.limiter.release()
+            self._finish(key, flight, error)
+
+    def _finish(self, key, flight, error):
+        with self._lock:
+            if self._in_flight.get(key) is flight:
+                del self._in_flight[key]
+        flight.finish(error)
+
+    def _call_with_backoff(self, flight, call):
+        for attempt in range(self.max_retries + 1):
+            delay = self._cooldown_until - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._count('upstream_calls')
+            try:
+                for chunk in call():
+                    flight.push(chunk)
+                return
+            except Exception as e:
+                rate_limited = is_rate_limited(e)
+                # Half-streamed answers can't be retried without repeating text.
+                if flight.chunks or attempt == self.max_retries or not (rate_limited or isinstance(e, TRANSIENT_ERRORS)):
+                    raise
+                delay = backoff_delay(attempt, rate_limited)
+                if rate_limited:
+                    self._count('rate_limited')
+                    with self._lock:
+                        # Everyone backs off, not just this request.
+                        self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+                self._count('retries')
+                logger.info("LLM call failed (%s: %s); retrying in %.1fs", type(e).__name__, e, delay)
+                time.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counts)
+        stats['active'] = self.limiter.active
+        stats['queued'] = self.limiter.waiting
+        return stats
+
+
+def _prompt_key(prompt):
+    return prompt if isinstance(prompt, str) else repr(prompt)
+
+
+class ScheduledLLM:
+    """Chat model wrapper that routes invoke() and stream() through an LLMScheduler"""
+
+    def __init__(self, llm, scheduler, session_provider=lambda: None):
+        self.llm = llm
+        self.scheduler = scheduler
+        self.session_provider = session_provider
+
+    def invoke(self, prompt):
+        key = ('invoke', id(self.llm), _prompt_key(prompt))
+        return self.scheduler.invoke(key, lambda: self.llm.invoke(prompt), self.session_provider())
+
+    def stream(self, prompt):
+        key = ('stream', id(self.llm), _prompt_key(prompt))
+        return self.scheduler.stream(key, lambda: self.llm.stream(prompt), self.session_provider())
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+class ScheduledEmbeddings:
+    """Embeddings wrapper that routes calls through an LLMScheduler, coalescing identical batches"""
+
+    def __init__(self, embeddings, scheduler, session_provider=lambda: None):
+        self.embeddings = embeddings
+        self.scheduler = scheduler
+        self.session_provider = session_provider
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        key = ('embed_documents', id(self.embeddings), tuple(texts))
+        return self.scheduler.invoke(key, lambda: self.embeddings.embed_documents(texts), self.session_provider())
+
+    def embed_query(self, text):
+        key = ('embed_query', id(self.embeddings), text)
+        return self.scheduler.invoke(key, lambda: self.embeddings.embed_query(text), self.session_provider())
+
+    def __getattr__(self, name):
+        return getattr(self.embeddings, name)
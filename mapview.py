@@ -0,0 +1,112 @@
+from html import escape
+
+from images import remote_image_url
+
+DEFAULT_CENTER = [33.75, 129.69]
+DEFAULT_ZOOM = 11
+# Above this many spots the page draws only the markers in view, at most MAX_VIEWPORT_MARKERS of them.
+VIEWPORT_MARKER_THRESHOLD = 500
+MAX_VIEWPORT_MARKERS = 300
+
+# Leaflet builds each marker from a plain data row; the popup body is only
+# created when the marker is first opened.
+MARKER_CALLBACK = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.bindTooltip(row[2]);
+    marker.bindPopup(function () {
+        var box = document.createElement('div');
+        var title = document.createElement('b');
+        title.textContent = row[2];
+        box.appendChild(title);
+        if (row[3]) {
+            var img = document.createElement('img');
+            img.src = row[3];
+            img.loading = 'lazy';
+            img.style.cssText = 'display:block;width:180px;max-width:90%;height:auto;margin:4px 0;';
+            box.appendChild(img);
+        }
+        var text = document.createElement('div');
+        text.textContent = row[4] || '';
+        box.appendChild(text);
+        return box;
+    }, {maxWidth: 300});
+    return marker;
+}
+"""
+
+
+def _folium():
+    # folium takes most of a second to import; only pay for it once a map is drawn.
+    import folium
+    from folium.plugins import FastMarkerCluster
+    return folium, FastMarkerCluster
+
+def marker_rows(spots):
+    """Compact [lat, lon, name, imageUrl, shortDescription] rows for spots with coordinates"""
+    rows = []
+    for spot in spots:
+        coords = spot.get('coordinates')
+        if coords and len(coords) >= 2:
+            rows.append([coords[0], coords[1], spot.get('name', ''), remote_image_url(spot.get('imageUrl', ''), 'thumb'),
+                         spot.get('shortDescription', '')])
+    return rows
+
+def build_spots_map(spots, include_markers=True):
+    """Base map fitted to the spots, optionally with all of them as one FastMarkerCluster layer.
+
+    Built once per catalogue version and shared across sessions, so callers
+    draw a `copy.deepcopy` of it; recentring is done through st_folium's
+    `center`/`zoom` arguments instead of rebuilding. Without markers, the
+    caller adds the visible ones via `viewport_layer`.
+    """
+    folium, FastMarkerCluster = _folium()
+    rows = marker_rows(spots)
+    center = rows[0][:2] if rows else DEFAULT_CENTER
+    map_all = folium.Map(location=center, zoom_start=DEFAULT_ZOOM, tiles="OpenStreetMap")
+    if rows:
+        if include_markers:
+            FastMarkerCluster(rows, callback=MARKER_CALLBACK).add_to(map_all)
+        lats, lons = [row[0] for row in rows], [row[1] for row in rows]
+        map_all.fit_bounds([[min(lats), min(lons)], [max(lats), max(lons)]], padding=(30, 30))
+    return map_all
+
+def viewport_layer(spots):
+    """FeatureGroup with markers for the spots currently in view"""
+    folium, _ = _folium()
+    layer = folium.FeatureGroup(name="Spots in view")
+    for row in marker_rows(spots):
+        popup_html = f"<b>{escape(row[2])}</b><br>{escape(row[4])}"
+        folium.Marker(
+            location=row[:2],
+            popup=folium.Popup(popup_html, max_width=300),
+            tooltip=row[2],
+        ).add_to(layer)
+    return layer
+
+def route_layer(itinerary):
+    """FeatureGroup with an itinerary's path and numbered stop markers"""
+    folium, _ = _folium()
+    layer = folium.FeatureGroup(name="Day plan")
+    points = [stop.spot['coordinates'][:2] for stop in itinerary.stops]
+    if len(points) > 1:
+        folium.PolyLine(points, color="#d33", weight=4, opacity=0.8).add_to(layer)
+    for n, (stop, point) in enumerate(zip(itinerary.stops, points), start=1):
+        folium.Marker(
+            location=point,
+            tooltip=f"{n}. {stop.spot.get('name', '')}",
+            icon=folium.DivIcon(
+                html=f'<div style="background:#d33;color:#fff;border-radius:50%;width:24px;height:24px;'
+                     f'line-height:24px;text-align:center;font-weight:bold;">{n}</div>',
+                icon_size=(24, 24), icon_anchor=(12, 12),
+            ),
+        ).add_to(layer)
+    return layer
+
+def bounds_from_map_state(state):
+    """(south, west, north, east) from st_folium's returned `bounds`, or None"""
+    bounds = (state or {}).get('bounds') or {}
+    south_west, north_east = bounds.get('_southWest'), bounds.get('_northEast')
+    if not south_west or not north_east or south_west.get('lat') is None:
+        return None
+    return south_west['lat'], south_west['lng'], north_east['lat'], north_east['lng']
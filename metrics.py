@@ -0,0 +1,210 @@
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Spans are recorded only when IKI_METRICS or IKI_DEBUG is set; otherwise
+# span() hands back one shared no-op object and costs a single flag check.
+ENABLED = bool(os.getenv("IKI_METRICS") or os.getenv("IKI_DEBUG"))
+METRICS_FILE = os.getenv("IKI_METRICS_FILE")
+METRICS_PORT = os.getenv("IKI_METRICS_PORT")
+
+# Upper bounds in milliseconds, Prometheus-style cumulative buckets.
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+METRIC_NAME = "iki_phase_duration_seconds"
+COUNTER_PREFIX = "iki_"
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (the max for the overflow bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.sum_ms / self.count if self.count else None,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'max_ms': self.max_ms,
+        }
+
+
+class Registry:
+    """Per-process histograms of phase durations and counters, plus the spans of the current script run"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def observe(self, name, ms):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(ms)
+        spans = getattr(self._local, 'spans', None)
+        if spans is not None:
+            spans.append((name, ms))
+
+    def increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def start_run(self):
+        self._local.spans = []
+
+    def run_spans(self):
+        return list(getattr(self._local, 'spans', None) or [])
+
+    def summaries(self):
+        with self._lock:
+            return {name: h.summary() for name, h in sorted(self.histograms.items())}
+
+    def counter_values(self):
+        with self._lock:
+            return dict(sorted(self.counters.items()))
+
+    def prometheus_text(self):
+        """Histograms and counters in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {METRIC_NAME} Time spent in each app phase.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        with self._lock:
+            for name, h in sorted(self.histograms.items()):
+                label = name.replace('\\', '\\\\').replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'{METRIC_NAME}_bucket{{phase="{label}",le="{bound / 1000:g}"}} {cumulative}')
+                lines.append(f'{METRIC_NAME}_bucket{{phase="{label}",le="+Inf"}} {h.count}')
+                lines.append(f'{METRIC_NAME}_sum{{phase="{label}"}} {h.sum_ms / 1000:.6f}')
+                lines.append(f'{METRIC_NAME}_count{{phase="{label}"}} {h.count}')
+            for name, value in sorted(self.counters.items()):
+                metric = f"{COUNTER_PREFIX}{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class _Span:
+    __slots__ = ('registry', 'name', 'started')
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, (time.perf_counter() - self.started) * 1000)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+REGISTRY = Registry()
+_NULL_SPAN = _NullSpan()
+_server = None
+_server_lock = threading.Lock()
+
+
+def span(name):
+    """Context manager timing one phase: `with metrics.span("map.build"): ...`"""
+    if not ENABLED:
+        return _NULL_SPAN
+    return _Span(REGISTRY, name)
+
+def observe(name, ms):
+    """Record a duration measured elsewhere, e.g. an LLM time-to-first-token"""
+    if ENABLED and ms is not None:
+        REGISTRY.observe(name, ms)
+
+def increment(name, value=1):
+    """Add to a process-wide counter, exported as iki_<name>_total"""
+    if ENABLED:
+        REGISTRY.increment(name, value)
+
+def start_run():
+    """Mark the start of a script run so the debug panel shows only its spans"""
+    if ENABLED:
+        REGISTRY.start_run()
+        _start_http_server()
+
+def finish_run():
+    """Write the Prometheus file, if one is configured"""
+    if ENABLED and METRICS_FILE:
+        write_prometheus(METRICS_FILE)
+
+def write_prometheus(path):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(REGISTRY.prometheus_text())
+    os.replace(tmp, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def _start_http_server():
+    """Serve /metrics on 127.0.0.1:IKI_METRICS_PORT, once per process"""
+    global _server
+    if not METRICS_PORT or _server is not None:
+        return
+    with _server_lock:
+        if _server is not None:
+            return
+        try:
+            _server = ThreadingHTTPServer(('127.0.0.1', int(METRICS_PORT)), _MetricsHandler)
+        except (OSError, ValueError) as e:
+            print(f"Metrics endpoint not started: {e}")
+            _server = False
+            return
+        threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
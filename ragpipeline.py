@@ -0,0 +1,180 @@
+import re
+import threading
+import time
+from collections import deque
+
+from answercache import replay
+
+CONDENSE_PROMPT = """Given the following conversation and a follow up question, rephrase the follow up question to be a standalone question, in its original language.
+
+Chat History:
+{chat_history}
+Follow Up Input: {question}
+Standalone question:"""
+
+ANSWER_PROMPT = """Use the following pieces of context to answer the question at the end. If you don't know the answer, just say that you don't know, don't try to make up an answer.
+
+{context}
+
+Question: {question}
+Helpful Answer:"""
+
+# Words that only make sense with the previous turns in view.
+FOLLOW_UP_WORDS = {
+    'it', 'its', "it's", 'there', 'that', 'this', 'these', 'those', 'they', 'them',
+    'their', 'he', 'she', 'him', 'her', 'here', 'one', 'ones', 'same', 'else',
+    'also', 'too', 'another', 'other', 'again', 'more', 'former', 'latter',
+}
+FOLLOW_UP_OPENERS = ('and ', 'what about', 'how about', 'why', 'then', 'so ', 'but ')
+MIN_STANDALONE_WORDS = 3
+TIMING_HISTORY = 200
+
+
+def needs_condensing(question, chat_history):
+    """Heuristic: True when `question` likely refers back to earlier turns"""
+    if not chat_history:
+        return False
+    text = question.strip().lower()
+    words = re.findall(r"[a-z']+", text)
+    if len(words) < MIN_STANDALONE_WORDS:
+        return True
+    if text.startswith(FOLLOW_UP_OPENERS):
+        return True
+    return any(word in FOLLOW_UP_WORDS for word in words)
+
+def format_history(chat_history, summary=''):
+    lines = [f"Summary of earlier conversation: {summary}"] if summary else []
+    lines.extend(f"Human: {human}\nAssistant: {ai}" for human, ai in chat_history)
+    return "\n".join(lines)
+
+def response_text(chunk):
+    """Text of an LLM response or stream chunk (a message, a plain string or a list of content parts)"""
+    content = getattr(chunk, 'content', chunk)
+    if isinstance(content, list):
+        content = ''.join(part if isinstance(part, str) else part.get('text', '') for part in content)
+    return content or ''
+
+
+class RagTurn:
+    """One streamed answer. Iterate it for text chunks; `timing` is filled in as it runs."""
+
+    def __init__(self, pipeline, question, chat_history, summary=''):
+        self.pipeline = pipeline
+        self.question = question
+        self.chat_history = chat_history
+        self.summary = summary
+        self.standalone_question = question
+        self.answer = ''
+        self.cached = False
+        self.timing = {
+            'condensed': False,
+            'condense_ms': 0.0,
+            'retrieval_ms': 0.0,
+            'ttft_ms': None,
+            'total_ms': None,
+            'cached': False,
+            'lexical_fast_path': False,
+        }
+
+    def __iter__(self):
+        pipeline = self.pipeline
+        started = time.perf_counter()
+
+        if needs_condensing(self.question, self.chat_history or self.summary):
+            t0 = time.perf_counter()
+            self.standalone_question = pipeline.condense(self.question, self.chat_history, self.summary)
+            self.timing['condensed'] = True
+            self.timing['condense_ms'] = (time.perf_counter() - t0) * 1000
+
+        scope = pipeline.scope_provider()
+        question_vector = None
+        cached_answer = None
+        t0 = time.perf_counter()
+        docs = pipeline.retriever.fast_path(self.standalone_question)
+        if docs is not None:
+            # A spot named outright needs neither a query embedding nor vector search.
+            self.timing['lexical_fast_path'] = True
+        elif pipeline.answer_cache is not None and pipeline.embeddings is not None:
+            question_vector = pipeline.embeddings.embed_query(self.standalone_question)
+            cached_answer = pipeline.answer_cache.lookup(question_vector, scope)
+
+        if cached_answer is not None:
+            self.cached = self.timing['cached'] = True
+            chunks = replay(cached_answer)
+        else:
+            if docs is None:
+                docs = pipeline.retriever.retrieve(self.standalone_question, question_vector)
+            self.timing['retrieval_ms'] = (time.perf_counter() - t0) * 1000
+            chunks = (
+                response_text(chunk)
+                for chunk in pipeline.llm.stream(pipeline.build_prompt(self.standalone_question, docs))
+            )
+
+        for text in chunks:
+            if not text:
+                continue
+            if self.timing['ttft_ms'] is None:
+                self.timing['ttft_ms'] = (time.perf_counter() - started) * 1000
+            self.answer += text
+            yield text
+
+        self.timing['total_ms'] = (time.perf_counter() - started) * 1000
+        if question_vector is not None and cached_answer is None and self.answer:
+            pipeline.answer_cache.store(question_vector, scope, self.standalone_question, self.answer)
+        pipeline.record(self.timing)
+
+
+class RagPipeline:
+    """Retrieval-augmented answering with a single streamed LLM call per turn.
+
+    Built once per process. The condensing call is only made when a question
+    looks like a follow-up; retrieval (through `retriever`, see
+    search.HybridRetriever) and prompt assembly happen here rather than inside
+    a LangChain chain, so the answer starts streaming as soon as the documents
+    are in.
+    """
+
+    def __init__(self, llm, retriever, embeddings=None, answer_cache=None, scope_provider=lambda: None):
+        self.llm = llm
+        self.retriever = retriever
+        self.embeddings = embeddings
+        self.answer_cache = answer_cache
+        self.scope_provider = scope_provider
+        self._timings = deque(maxlen=TIMING_HISTORY)
+        self._lock = threading.Lock()
+
+    def condense(self, question, chat_history, summary=''):
+        prompt = CONDENSE_PROMPT.format(chat_history=format_history(chat_history, summary), question=question)
+        return response_text(self.llm.invoke(prompt)).strip() or question
+
+    def build_prompt(self, question, docs):
+        context = "\n\n".join(doc.page_content for doc in docs)
+        return ANSWER_PROMPT.format(context=context, question=question)
+
+    def stream(self, question, chat_history=(), summary=''):
+        """Start a turn; `chat_history` is [(question, answer)], `summary` covers turns before it"""
+        return RagTurn(self, question, list(chat_history), summary)
+
+    def record(self, timing):
+        with self._lock:
+            self._timings.append(dict(timing))
+
+    def stats(self):
+        """Mean time-to-first-token and total latency over recent turns, split by whether they condensed"""
+        with self._lock:
+            timings = list(self._timings)
+        summary = {}
+        for label, subset in (
+            ('all', timings),
+            ('condensed', [t for t in timings if t['condensed']]),
+            ('direct', [t for t in timings if not t['condensed'] and not t['cached']]),
+            ('cached', [t for t in timings if t['cached']]),
+            ('lexical_fast_path', [t for t in timings if t['lexical_fast_path']]),
+        ):
+            ttft = [t['ttft_ms'] for t in subset if t['ttft_ms'] is not None]
+            summary[label] = {
+                'turns': len(subset),
+                'mean_ttft_ms': sum(ttft) / len(ttft) if ttft else None,
+                'mean_total_ms': sum(t['total_ms'] for t in subset) / len(subset) if subset else None,
+            }
+        return summary
@@ -0,0 +1,15 @@
+import random
+
+BASE_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+RATE_LIMIT_MARKERS = ('429', 'resourceexhausted', 'resource exhausted', 'rate limit', 'quota')
+
+
+def is_rate_limited(exc):
+    text = f"{type(exc).__name__} {exc}".lower()
+    return getattr(exc, 'status_code', None) == 429 or any(marker in text for marker in RATE_LIMIT_MARKERS)
+
+def backoff_delay(attempt, rate_limited=False):
+    """Exponential backoff with jitter; rate limits back off twice as long"""
+    delay = BASE_BACKOFF_SECONDS * 2 ** attempt * (2 if rate_limited else 1)
+    return min(delay, MAX_BACKOFF_SECONDS) * random.uniform(0.5, 1.0)
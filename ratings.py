@@ -0,0 +1,268 @@
+import os
+import threading
+
+import numpy as np
+
+from sqlitedb import ThreadLocalConnection
+
+SCORES = np.arange(1, 6)
+# Share of 1..5 star ratings in generated data: 3 to 5 stars, evenly, as the demo data always had.
+SCORE_WEIGHTS = np.array([0.0, 0.0, 1 / 3, 1 / 3, 1 / 3])
+DEFAULT_START = '2024-01-01'
+DEFAULT_END = '2026-01-01'
+INITIAL_CAPACITY = 1024
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB_PATH = os.path.join(BASE_DIR, 'ratings.db')
+
+
+def month_label(ordinal):
+    year, month = divmod(int(ordinal), 12)
+    return f"{year}-{month + 1:02d}"
+
+def _month_ordinals(days):
+    months = days.astype('datetime64[M]').astype(np.int64)
+    # datetime64[M] counts months since 1970-01.
+    return months + 1970 * 12
+
+
+class Vocabulary:
+    """String <-> small integer code mapping for a categorical column (not thread-safe; RatingsStore locks it)"""
+
+    def __init__(self, values=()):
+        self.values = []
+        self.codes = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+class RatingsStore:
+    """Columnar, NumPy-backed ratings with rollups kept up to date on every insert.
+
+    Ratings are stored as parallel code/score/day arrays that grow by
+    doubling. Per-location counts and score sums, per-location score
+    histograms and per-(month, location) counts and sums are updated with
+    bincount on each insert, so the summaries never rescan the ratings.
+    """
+
+    def __init__(self, locations=(), users=(), comments=()):
+        self.locations = Vocabulary(locations)
+        self.users = Vocabulary(users)
+        self.comments = Vocabulary(comments)
+        self.size = 0
+        self._columns = {
+            'user': np.empty(INITIAL_CAPACITY, dtype=np.int32),
+            'location': np.empty(INITIAL_CAPACITY, dtype=np.int32),
+            'score': np.empty(INITIAL_CAPACITY, dtype=np.int8),
+            'comment': np.empty(INITIAL_CAPACITY, dtype=np.int32),
+            'day': np.empty(INITIAL_CAPACITY, dtype='datetime64[D]'),
+        }
+        self._count = np.zeros(0, dtype=np.int64)
+        self._total = np.zeros(0, dtype=np.int64)
+        self._histogram = np.zeros((0, len(SCORES) + 1), dtype=np.int64)
+        self._monthly = {}  # month ordinal -> (count[location], total[location])
+        self._lock = threading.Lock()
+        self._grow_rollups()
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        capacity = len(self._columns['score'])
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self._columns[name] = grown
+
+    def _grow_rollups(self):
+        n = len(self.locations)
+        if n > len(self._count):
+            extra = n - len(self._count)
+            self._count = np.concatenate([self._count, np.zeros(extra, dtype=np.int64)])
+            self._total = np.concatenate([self._total, np.zeros(extra, dtype=np.int64)])
+            self._histogram = np.vstack([self._histogram, np.zeros((extra, self._histogram.shape[1]), dtype=np.int64)])
+            self._monthly = {m: (np.pad(c, (0, extra)), np.pad(t, (0, extra))) for m, (c, t) in self._monthly.items()}
+
+    def add_columns(self, users, locations, scores, comments, days):
+        """Append ratings given as parallel arrays of codes, scores (1-5) and datetime64[D] days"""
+        with self._lock:
+            self._append(users, locations, scores, comments, days)
+
+    def _append(self, users, locations, scores, comments, days):
+        scores = np.asarray(scores, dtype=np.int8)
+        locations = np.asarray(locations, dtype=np.int32)
+        days = np.asarray(days, dtype='datetime64[D]')
+        if scores.size and (scores.min() < SCORES[0] or scores.max() > SCORES[-1]):
+            raise ValueError("scores must be between 1 and 5")
+        n = len(scores)
+        self._reserve(n)
+        start, end = self.size, self.size + n
+        self._columns['user'][start:end] = users
+        self._columns['location'][start:end] = locations
+        self._columns['score'][start:end] = scores
+        self._columns['comment'][start:end] = comments
+        self._columns['day'][start:end] = days
+        self.size = end
+        self._update_rollups(locations, scores, days)
+
+    def _update_rollups(self, locations, scores, days):
+        self._grow_rollups()
+        n_locations = len(self.locations)
+        weights = scores.astype(np.int64)
+        self._count += np.bincount(locations, minlength=n_locations)
+        self._total += np.bincount(locations, weights=weights, minlength=n_locations).astype(np.int64)
+        np.add.at(self._histogram, (locations, scores), 1)
+        months = _month_ordinals(days)
+        keys, inverse = np.unique(months * n_locations + locations, return_inverse=True)
+        counts = np.bincount(inverse)
+        totals = np.bincount(inverse, weights=weights).astype(np.int64)
+        for key, count, total in zip(keys.tolist(), counts.tolist(), totals.tolist()):
+            month, location = divmod(key, n_locations)
+            entry = self._monthly.get(month)
+            if entry is None:
+                entry = self._monthly[month] = (np.zeros(n_locations, dtype=np.int64),
+                                                np.zeros(n_locations, dtype=np.int64))
+            entry[0][location] += count
+            entry[1][location] += total
+
+    def add(self, user, location, score, comment='', date=None):
+        """Insert one rating; `date` is an ISO date string (default: today)"""
+        day = np.datetime64(date or 'today', 'D')
+        # Codes are assigned under the lock, or two sessions could give two names the same code.
+        with self._lock:
+            self._append([self.users.code(user)], [self.locations.code(location)], [score],
+                         [self.comments.code(comment)], [day])
+
+    def add_records(self, records):
+        """Bulk-insert ratings given as dicts in the records() format"""
+        records = list(records)
+        if records:
+            with self._lock:
+                self._append(
+                    [self.users.code(r['user']) for r in records],
+                    [self.locations.code(r['location']) for r in records],
+                    [r['score'] for r in records],
+                    [self.comments.code(r.get('comment', '')) for r in records],
+                    [np.datetime64(r['date'], 'D') for r in records],
+                )
+        return self
+
+    def generate(self, num, seed=None, start=DEFAULT_START, end=DEFAULT_END):
+        """Bulk-append `num` synthetic ratings over the known locations, users and comments"""
+        if not (len(self.locations) and len(self.users) and len(self.comments)):
+            raise ValueError("generate() needs at least one location, user and comment")
+        rng = np.random.default_rng(seed)
+        first, last = np.datetime64(start, 'D'), np.datetime64(end, 'D')
+        span = int((last - first).astype(np.int64))
+        self.add_columns(
+            rng.integers(0, len(self.users), num),
+            rng.integers(0, len(self.locations), num),
+            rng.choice(SCORES, size=num, p=SCORE_WEIGHTS),
+            rng.integers(0, len(self.comments), num),
+            first + rng.integers(0, span, num).astype('timedelta64[D]'),
+        )
+        return self
+
+    def records(self, start=0, stop=None):
+        """Ratings as dicts in the utils.generate_ratings format"""
+        with self._lock:
+            stop = self.size if stop is None else min(stop, self.size)
+            # Copies: add_columns may reallocate the columns or extend the vocabularies meanwhile.
+            cols = {name: column[start:stop].copy() for name, column in self._columns.items()}
+            users, locations, comments = list(self.users.values), list(self.locations.values), list(self.comments.values)
+        return [
+            {
+                "user": users[u],
+                "location": locations[l],
+                "score": int(s),
+                "comment": comments[c],
+                "date": str(d),
+            }
+            for u, l, s, c, d in zip(cols['user'].tolist(), cols['location'].tolist(), cols['score'].tolist(),
+                                     cols['comment'].tolist(), cols['day'])
+        ]
+
+    def _location_index(self, location):
+        code = self.locations.codes.get(location)
+        if code is None:
+            raise KeyError(location)
+        return code
+
+    def summary(self):
+        """Overall count and mean score"""
+        with self._lock:
+            count, total = int(self._count.sum()), int(self._total.sum())
+        return {'count': count, 'mean': total / count if count else None}
+
+    def by_location(self):
+        """[{location, count, mean}] in vocabulary order"""
+        with self._lock:
+            count, total = self._count.copy(), self._total.copy()
+            names = list(self.locations.values)
+        return [
+            {'location': name, 'count': int(c), 'mean': t / c if c else None}
+            for name, c, t in zip(names, count.tolist(), total.tolist())
+        ]
+
+    def by_month(self, location=None):
+        """[{month: 'YYYY-MM', count, mean}] in month order, for one location or all"""
+        with self._lock:
+            index = None if location is None else self._location_index(location)
+            # The per-month arrays are updated in place, so they are summed under the lock.
+            months = [(month, int(count.sum() if index is None else count[index]),
+                       int(total.sum() if index is None else total[index]))
+                      for month, (count, total) in sorted(self._monthly.items())]
+        return [{'month': month_label(month), 'count': c, 'mean': t / c} for month, c, t in months if c]
+
+    def histogram(self, location=None):
+        """{score: count} for one location or all"""
+        with self._lock:
+            counts = self._histogram.sum(axis=0) if location is None else self._histogram[self._location_index(location)].copy()
+        return {int(score): int(counts[score]) for score in SCORES}
+
+
+class RatingsLog:
+    """SQLite (WAL) record of ratings submitted through the app.
+
+    RatingsStore lives in memory; the app replays this log into it at
+    startup so submissions survive restarts.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._connect = ThreadLocalConnection(db_path)
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS ratings ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, user TEXT NOT NULL, location TEXT NOT NULL, "
+            "score INTEGER NOT NULL, comment TEXT NOT NULL, date TEXT NOT NULL)"
+        )
+
+    def add(self, user, location, score, comment='', date=None):
+        """Persist one rating and return it as a records()-style dict"""
+        record = {'user': user, 'location': location, 'score': int(score), 'comment': comment,
+                  'date': str(np.datetime64(date or 'today', 'D'))}
+        self._connect().execute(
+            "INSERT INTO ratings (user, location, score, comment, date) VALUES (?, ?, ?, ?, ?)",
+            (record['user'], record['location'], record['score'], record['comment'], record['date']),
+        )
+        return record
+
+    def records(self):
+        rows = self._connect().execute(
+            "SELECT user, location, score, comment, date FROM ratings ORDER BY id"
+        ).fetchall()
+        return [{'user': u, 'location': l, 'score': s, 'comment': c, 'date': d} for u, l, s, c, d in rows]
@@ -0,0 +1,90 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ragpipeline import response_text
+
+DIGEST_PROMPT = """Here are recent visitor reviews of {name}, a tourist spot in {destination}.
+
+{reviews}
+
+In at most two sentences, summarise what visitors say about it. Mention recurring praise or complaints; do not invent details.
+Summary:"""
+
+MIN_REVIEWS = 3
+REFRESH_AFTER = 5
+SAMPLE_SIZE = 40
+
+logger = logging.getLogger(__name__)
+
+
+class ReviewDigester:
+    """Cached "what visitors say" summaries, regenerated in the background.
+
+    A digest is stored with the review-set version and count it was built
+    from. It is only rebuilt once `refresh_after` new reviews have arrived
+    (or when a spot first reaches `min_reviews`), on a single worker thread,
+    so rendering a card never waits on the LLM.
+    """
+
+    def __init__(self, store, llm_provider, min_reviews=MIN_REVIEWS, refresh_after=REFRESH_AFTER,
+                 sample_size=SAMPLE_SIZE, destination="Iki Island"):
+        self.store = store
+        self.llm_provider = llm_provider
+        self.destination = destination
+        self.min_reviews = min_reviews
+        self.refresh_after = refresh_after
+        self.sample_size = sample_size
+        self._digests = store.review_digests()
+        self._pending = set()
+        self._failed = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="review-digest")
+
+    def get(self, spot_id):
+        """Latest digest text for a spot, or None"""
+        entry = self._digests.get(spot_id)
+        return entry[2] if entry else None
+
+    def is_stale(self, spot_id, stats):
+        if stats['count'] < self.min_reviews:
+            return False
+        entry = self._digests.get(spot_id)
+        if entry is None:
+            return True
+        version, count, _ = entry
+        return version != stats['version'] and abs(stats['count'] - count) >= self.refresh_after
+
+    def refresh_if_stale(self, spot, stats):
+        """Queue a rebuild when the spot has enough new reviews; returns True if one was queued"""
+        spot_id = spot.get('id')
+        if not self.is_stale(spot_id, stats) or self._failed.get(spot_id) == stats['version']:
+            return False
+        with self._lock:
+            if spot_id in self._pending:
+                return False
+            self._pending.add(spot_id)
+        self._executor.submit(self._rebuild, spot_id, spot.get('name', ''), dict(stats))
+        return True
+
+    def _rebuild(self, spot_id, name, stats):
+        try:
+            # Another process may already have written a fresh digest.
+            latest = self.store.review_digests().get(spot_id)
+            if latest is not None:
+                self._digests[spot_id] = latest
+                if not self.is_stale(spot_id, stats):
+                    return
+            reviews = self.store.recent_reviews(spot_id, self.sample_size)
+            prompt = DIGEST_PROMPT.format(name=name, destination=self.destination, reviews="\n".join(f"- {r}" for r in reviews))
+            digest = response_text(self.llm_provider().invoke(prompt)).strip()
+            if digest:
+                self.store.save_review_digest(spot_id, stats['version'], stats['count'], digest)
+                self._digests[spot_id] = (stats['version'], stats['count'], digest)
+        except Exception:
+            # Don't retry until the review set changes again.
+            self._failed[spot_id] = stats['version']
+            logger.warning("Review digest for spot %s failed", spot_id, exc_info=True)
+        finally:
+            with self._lock:
+                self._pending.discard(spot_id)
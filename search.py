@@ -0,0 +1,457 @@
+import bisect
+import heapq
+import json
+import hashlib
+import math
+import re
+import threading
+from collections import Counter
+
+from spotindex import make_document
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+SEARCH_STOPWORDS = {
+    'a', 'an', 'and', 'are', 'at', 'be', 'by', 'can', 'do', 'does', 'for', 'from',
+    'get', 'go', 'how', 'i', 'in', 'is', 'it', 'me', 'of', 'on', 'or', 'should', 'tell',
+    'the', 'there', 'to', 'what', 'when', 'where', 'which', 'who', 'why', 'with', 'you',
+    'about',
+}
+# Chat questions name the island and ask for the "best" spot; for retrieval those words
+# don't tell spots apart, but in the search box they are what the visitor typed.
+STOPWORDS = SEARCH_STOPWORDS | {'best', 'iki', 'island'}
+RRF_K = 60
+PREFIX_EXPANSIONS = 50
+# A last token shorter than this is ignored until more is typed: it would expand to
+# terms whose postings cover most of the catalogue.
+MIN_PREFIX_LENGTH = 3
+
+# Field -> weight. Retrieval mirrors the text that is embedded for FAISS;
+# the search box also covers the long-form history and meaning.
+RETRIEVAL_FIELDS = {'name': 3, 'category': 1, 'shortDescription': 1, 'highlights': 1}
+SEARCH_FIELDS = {'name': 3, 'shortDescription': 2, 'highlights': 2, 'fullHistory': 1, 'meaning': 1}
+
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August',
+          'September', 'October', 'November', 'December']
+_MONTH_LOOKUP = {name.lower()[:3]: i for i, name in enumerate(MONTHS)}
+DURATION_BUCKETS = [(1, 'Up to 1 hour'), (2, '1-2 hours'), (3, '2-3 hours'), (float('inf'), '3+ hours')]
+# Minutes per unit; a number without a unit takes the next (or previous) one's, else hours.
+DURATION_UNITS = {'h': 60, 'hr': 60, 'hrs': 60, 'hour': 60, 'hours': 60,
+                  'm': 1, 'min': 1, 'mins': 1, 'minute': 1, 'minutes': 1}
+DURATION_PHRASES = {'half day': '4 hours', 'half-day': '4 hours', 'full day': '8 hours', 'full-day': '8 hours',
+                    'all day': '8 hours', 'whole day': '8 hours'}
+_DURATION_TERM_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(hours?|hrs?|h|minutes?|mins?|m)?(?![a-z])")
+_DURATION_RANGE_RE = re.compile(r"-|–|\bto\b|\bor\b")
+
+
+def tokenize(text, stopwords=STOPWORDS):
+    return [t for t in TOKEN_RE.findall((text or '').lower()) if t not in stopwords]
+
+def _field_text(spot, field):
+    value = spot.get(field)
+    if isinstance(value, list):
+        return ' '.join(str(v) for v in value)
+    return value or ''
+
+def _spot_id(spot):
+    return spot.get('id')
+
+
+class BM25Index:
+    """In-process inverted index with Okapi BM25 scoring over weighted spot fields.
+
+    Documents are keyed by spot id and can be added, replaced or removed one
+    at a time; postings and length statistics are updated in place.
+    """
+
+    def __init__(self, spots=(), fields=RETRIEVAL_FIELDS, k1=1.5, b=0.75, stopwords=STOPWORDS):
+        self.fields = fields
+        self.stopwords = stopwords
+        self.k1 = k1
+        self.b = b
+        self.spots = {}
+        self.postings = {}
+        self.doc_terms = {}
+        self.doc_lengths = {}
+        self.name_terms = {}
+        self.total_length = 0
+        self._vocabulary = None
+        for spot in spots:
+            self.add(spot)
+
+    def __len__(self):
+        return len(self.spots)
+
+    @property
+    def avg_length(self):
+        return self.total_length / len(self.spots) if self.spots else 0.0
+
+    def add(self, spot):
+        spot_id = _spot_id(spot)
+        if spot_id in self.spots:
+            self.remove(spot_id)
+        counts = Counter()
+        for field, weight in self.fields.items():
+            field_counts = Counter(tokenize(_field_text(spot, field), self.stopwords))
+            if weight != 1:
+                field_counts = {token: tf * weight for token, tf in field_counts.items()}
+            counts.update(field_counts)
+        for term, tf in counts.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                self._vocabulary = None
+            postings[spot_id] = tf
+        self.spots[spot_id] = spot
+        self.doc_terms[spot_id] = counts
+        self.name_terms[spot_id] = set(tokenize(spot.get('name'), self.stopwords))
+        self.doc_lengths[spot_id] = sum(counts.values())
+        self.total_length += self.doc_lengths[spot_id]
+
+    def remove(self, spot_id):
+        counts = self.doc_terms.pop(spot_id, None)
+        if counts is None:
+            return
+        for term in counts:
+            postings = self.postings[term]
+            del postings[spot_id]
+            if not postings:
+                del self.postings[term]
+                self._vocabulary = None
+        self.total_length -= self.doc_lengths.pop(spot_id)
+        del self.spots[spot_id]
+        del self.name_terms[spot_id]
+
+    def idf(self, term):
+        df = len(self.postings.get(term, ()))
+        n = len(self.spots)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def expand_prefix(self, prefix, limit=PREFIX_EXPANSIONS):
+        """Indexed terms starting with `prefix`, for search-as-you-type"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:start + limit]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def scores(self, terms, candidates=None):
+        """{spot_id: score} summed over `terms`, optionally limited to `candidates`"""
+        scores = {}
+        avg_length = self.avg_length or 1.0
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for spot_id, tf in postings.items():
+                if candidates is not None and spot_id not in candidates:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[spot_id] / avg_length)
+                scores[spot_id] = scores.get(spot_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query, k=10):
+        """Return [(score, spot_id)] for the top `k` documents, best first"""
+        scores = self.scores(set(tokenize(query, self.stopwords)))
+        return heapq.nlargest(k, ((score, spot_id) for spot_id, score in scores.items()))
+
+    def strong_match(self, query, dominance=1.5):
+        """Id of a spot the query names outright, or None.
+
+        The top hit must match a query token in its name and outscore the
+        runner-up by `dominance`.
+        """
+        hits = self.search(query, k=2)
+        if not hits:
+            return None
+        top_score, top_id = hits[0]
+        if not self.name_terms[top_id] & set(tokenize(query, self.stopwords)):
+            return None
+        if len(hits) > 1 and top_score < dominance * hits[1][0]:
+            return None
+        return top_id
+
+    def document(self, spot_id):
+        spot = self.spots[spot_id]
+        return make_document(spot)
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse ranked lists of documents keyed by metadata name"""
+    scores = {}
+    docs = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = doc.metadata.get('name') or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever:
+    """BM25 + FAISS retrieval fused with reciprocal rank fusion.
+
+    `lexical_provider` and `store_provider` are called per query, so both
+    indexes can be swapped underneath a long-lived retriever.
+    """
+
+    def __init__(self, lexical_provider, store_provider, k=3, fetch_k=8):
+        self.lexical_provider = lexical_provider
+        self.store_provider = store_provider
+        self.k = k
+        self.fetch_k = fetch_k
+
+    def fast_path(self, question):
+        """Documents for a query that names a spot outright, without embedding it; else None"""
+        lexical = self.lexical_provider()
+        if lexical is None or not len(lexical):
+            return None
+        if lexical.strong_match(question) is None:
+            return None
+        return [lexical.document(spot_id) for _, spot_id in lexical.search(question, k=self.k)]
+
+    def retrieve(self, question, question_vector=None):
+        rankings = []
+        lexical = self.lexical_provider()
+        if lexical is not None and len(lexical):
+            rankings.append([lexical.document(i) for _, i in lexical.search(question, k=self.fetch_k)])
+        store = self.store_provider()
+        if store is not None:
+            if question_vector is not None:
+                rankings.append(store.similarity_search_by_vector(question_vector, k=self.fetch_k))
+            else:
+                rankings.append(store.similarity_search(question, k=self.fetch_k))
+        return reciprocal_rank_fusion(rankings)[:self.k]
+
+
+def best_time_months(text):
+    """Month names covered by a `bestTime` string such as 'March-May, September-November' or 'Year-round'"""
+    text = (text or '').lower()
+    if 'year-round' in text or 'year round' in text or 'all year' in text:
+        return list(MONTHS)
+    months = set()
+    for part in re.split(r"[,;/]", re.sub(r"\(.*?\)", "", text)):
+        found = [_MONTH_LOOKUP[m[:3]] for m in re.findall(r"[a-z]+", part) if m[:3] in _MONTH_LOOKUP]
+        if len(found) >= 2:
+            start, end = found[0], found[-1]
+            i = start
+            while True:
+                months.add(i)
+                if i == end:
+                    break
+                i = (i + 1) % 12
+        months.update(found)
+    return [MONTHS[i] for i in sorted(months)]
+
+def duration_range(text):
+    """(shortest, longest) minutes of a `duration` string, or None.
+
+    Understands ranges ('1.5-3 hours', '30-60 minutes'), abbreviations
+    ('45 min', '2 hrs'), compounds ('1 hour 30 minutes') and 'Half day'.
+    """
+    text = (text or '').lower()
+    for phrase, replacement in DURATION_PHRASES.items():
+        text = text.replace(phrase, replacement)
+    terms = list(_DURATION_TERM_RE.finditer(text))
+    if not terms:
+        return None
+    units = [DURATION_UNITS.get(term.group(2)) for term in terms]
+    for i in range(len(units) - 2, -1, -1):
+        units[i] = units[i] or units[i + 1]
+    for i in range(1, len(units)):
+        units[i] = units[i] or units[i - 1]
+    values = []
+    for i, (term, unit) in enumerate(zip(terms, units)):
+        minutes = float(term.group(1)) * (unit or 60)
+        compound = (i and term.group(2) and terms[i - 1].group(2) and units[i - 1] > unit
+                    and not _DURATION_RANGE_RE.search(text, terms[i - 1].end(), term.start()))
+        if compound:
+            values[-1] += minutes
+        else:
+            values.append(minutes)
+    return min(values), max(values)
+
+def duration_bucket(text):
+    """Bucket label for a `duration` string like '1.5-3 hours', '30-60 minutes' or 'Half day'"""
+    found = duration_range(text)
+    if found is None:
+        return None
+    hours = found[1] / 60
+    for upper, label in DURATION_BUCKETS:
+        if hours <= upper:
+            return label
+    return None
+
+
+def spot_facets(spot):
+    return {
+        'category': [spot.get('category')] if spot.get('category') else [],
+        'month': best_time_months(spot.get('bestTime')),
+        'duration': [b for b in [duration_bucket(spot.get('duration'))] if b],
+    }
+
+def _spot_fingerprint(spot):
+    data = {k: v for k, v in spot.items() if k != 'user_reviews'}
+    return hashlib.sha1(json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class SpotSearchIndex:
+    """Full-text search over spot text fields with category, month and duration facets.
+
+    Facet postings and their counts are maintained as spots are added or
+    removed, and `sync()` only reindexes spots whose content changed, so the
+    index is updated incrementally as the catalogue changes. Queries intersect
+    postings rather than scanning documents. One index is shared by every
+    session, so updates and queries take the same lock; queries are pure
+    Python and hold the GIL anyway, so they would not run in parallel.
+    """
+
+    FACETS = ('category', 'month', 'duration')
+
+    def __init__(self, spots=()):
+        self.text = BM25Index(fields=SEARCH_FIELDS, stopwords=SEARCH_STOPWORDS)
+        self.facet_postings = {facet: {} for facet in self.FACETS}
+        self.facet_counts = {facet: Counter() for facet in self.FACETS}
+        self.doc_facets = {}
+        self.fingerprints = {}
+        self.order = {}
+        self.version = None
+        self._lock = threading.RLock()
+        self.sync(spots)
+
+    def __len__(self):
+        return len(self.text)
+
+    def add(self, spot, fingerprint=None):
+        spot_id = _spot_id(spot)
+        with self._lock:
+            self.remove(spot_id)
+            self.text.add(spot)
+            facets = spot_facets(spot)
+            for facet, values in facets.items():
+                for value in values:
+                    self.facet_postings[facet].setdefault(value, set()).add(spot_id)
+                    self.facet_counts[facet][value] += 1
+            self.doc_facets[spot_id] = facets
+            self.fingerprints[spot_id] = fingerprint or _spot_fingerprint(spot)
+
+    def remove(self, spot_id):
+        with self._lock:
+            facets = self.doc_facets.pop(spot_id, None)
+            if facets is None:
+                return
+            self.text.remove(spot_id)
+            for facet, values in facets.items():
+                for value in values:
+                    postings = self.facet_postings[facet][value]
+                    postings.discard(spot_id)
+                    self.facet_counts[facet][value] -= 1
+                    if not postings:
+                        del self.facet_postings[facet][value]
+                        del self.facet_counts[facet][value]
+            self.fingerprints.pop(spot_id, None)
+
+    def sync(self, spots, version=None):
+        """Bring the index in line with `spots`, touching only added, changed or removed ones.
+
+        With a `version`, does nothing if the index is already at it, so
+        sessions that race to sync the same data only do the work once.
+        """
+        with self._lock:
+            if version is not None and version == self.version:
+                return
+            seen = set()
+            for position, spot in enumerate(spots):
+                spot_id = _spot_id(spot)
+                seen.add(spot_id)
+                self.order[spot_id] = position
+                fingerprint = _spot_fingerprint(spot)
+                if self.fingerprints.get(spot_id) != fingerprint:
+                    self.add(spot, fingerprint)
+                else:
+                    # Keep the latest object (with fresh reviews) without reindexing it.
+                    self.text.spots[spot_id] = spot
+            for spot_id in [s for s in self.doc_facets if s not in seen]:
+                self.remove(spot_id)
+                self.order.pop(spot_id, None)
+            self.version = version
+
+    def _matching_ids(self, query):
+        tokens = tokenize(query, self.text.stopwords)
+        if tokens and len(tokens[-1]) < MIN_PREFIX_LENGTH:
+            tokens.pop()
+        if not tokens:
+            return None, []
+        term_groups = []
+        for i, token in enumerate(tokens):
+            # The last token may still be being typed, so it also matches as a prefix.
+            terms = self.text.expand_prefix(token) if i == len(tokens) - 1 else [token]
+            if token in self.text.postings and token not in terms:
+                terms.append(token)
+            term_groups.append(terms)
+        matched = None
+        for terms in sorted(term_groups, key=lambda g: sum(len(self.text.postings.get(t, ())) for t in g)):
+            ids = set()
+            for term in terms:
+                ids.update(self.text.postings.get(term, ()))
+            matched = ids if matched is None else matched & ids
+            if not matched:
+                return set(), []
+        return matched, [term for group in term_groups for term in group]
+
+    def search(self, query='', filters=None, limit=None):
+        """Return (spots, facet_counts) for a query with AND-ed facet filters.
+
+        `filters` maps a facet name to the selected values; values within a
+        facet are OR-ed. Counts describe the matching spots, ignoring the
+        facet's own filter so other values stay selectable.
+        """
+        with self._lock:
+            return self._search(query, filters, limit)
+
+    def _search(self, query, filters, limit):
+        filters = {facet: set(values) for facet, values in (filters or {}).items() if values}
+        text_ids, terms = self._matching_ids(query)
+
+        def facet_ids(facet):
+            ids = set()
+            for value in filters[facet]:
+                ids.update(self.facet_postings[facet].get(value, ()))
+            return ids
+
+        filtered = {facet: facet_ids(facet) for facet in filters}
+
+        def combine(exclude=None):
+            result = text_ids
+            for facet, ids in filtered.items():
+                if facet == exclude:
+                    continue
+                result = set(ids) if result is None else result & ids
+            return result
+
+        matched = combine()
+        if matched is None:
+            ordered = sorted(self.doc_facets, key=lambda s: self.order.get(s, 0))
+        elif terms:
+            scores = self.text.scores(terms, candidates=matched)
+            ordered = sorted(matched, key=lambda s: (-scores.get(s, 0.0), self.order.get(s, 0)))
+        else:
+            ordered = sorted(matched, key=lambda s: self.order.get(s, 0))
+        if limit is not None:
+            ordered = ordered[:limit]
+
+        counts = {}
+        for facet in self.FACETS:
+            base = combine(exclude=facet)
+            if base is None:
+                counts[facet] = dict(self.facet_counts[facet])
+            else:
+                counts[facet] = {
+                    value: len(base & ids) for value, ids in self.facet_postings[facet].items()
+                    if base & ids
+                }
+        return [self.text.spots[s] for s in ordered], counts
@@ -0,0 +1,273 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import traceback
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'faiss_index')
+MANIFEST_NAME = 'manifest.json'
+POINTER_NAME = 'CURRENT'
+KEEP_VERSIONS = 3
+
+
+def spot_document_text(item):
+    return f"Spot Name: {item.get('name')}. Category: {item.get('category')}. " \
+           f"Description: {item.get('shortDescription')}. Highlights: {', '.join(item.get('highlights', []))}"
+
+def spot_key(item):
+    return f"spot-{item.get('id')}"
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+_langchain = None
+
+
+def load_langchain():
+    """(FAISS, Document) from whichever LangChain packages are installed; either may be None.
+
+    Imported on first use rather than with this module, so pages that never
+    touch the vector store don't pay for LangChain at startup.
+    """
+    global _langchain
+    if _langchain is None:
+        try:
+            from langchain_community.vectorstores import FAISS
+        except Exception:
+            try:
+                from langchain.vectorstores import FAISS
+            except Exception:
+                FAISS = None
+        try:
+            from langchain_core.documents import Document
+        except Exception:
+            try:
+                from langchain.schema import Document
+            except Exception:
+                Document = None
+        _langchain = (FAISS, Document)
+    return _langchain
+
+def _require_langchain():
+    FAISS, Document = load_langchain()
+    if FAISS is None:
+        raise ImportError("FAISS vectorstore not available. Install 'langchain_community' or compatible 'langchain' package.")
+    if Document is None:
+        raise ImportError("Document class is not available from LangChain. Install compatible 'langchain_core' or 'langchain' package.")
+    return FAISS, Document
+
+
+class IndexDirectory:
+    """Versioned FAISS index directory with an atomically swapped CURRENT pointer.
+
+    Each published index lives in its own `v<timestamp>` subdirectory next to
+    a manifest of per-document content hashes. Readers follow the CURRENT
+    file, so a rebuild never touches the files a live index was loaded from.
+    An index saved directly in the base directory (the original layout) is
+    still picked up until the first publish.
+    """
+
+    def __init__(self, base_path=DEFAULT_INDEX_PATH):
+        self.base_path = base_path
+
+    def current_path(self):
+        pointer = os.path.join(self.base_path, POINTER_NAME)
+        try:
+            with open(pointer, 'r', encoding='utf-8') as f:
+                name = f.read().strip()
+            path = os.path.join(self.base_path, name)
+            if os.path.exists(os.path.join(path, 'index.faiss')):
+                return path
+        except FileNotFoundError:
+            pass
+        if os.path.exists(os.path.join(self.base_path, 'index.faiss')):
+            return self.base_path
+        return None
+
+    def load(self, embeddings):
+        path = self.current_path()
+        if path is None:
+            return None, None
+        FAISS, _ = _require_langchain()
+        store = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+        manifest = None
+        try:
+            with open(os.path.join(path, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            pass
+        return store, manifest
+
+    def publish(self, store, manifest):
+        """Save `store` into a fresh version directory and switch CURRENT to it"""
+        os.makedirs(self.base_path, exist_ok=True)
+        name = f"v{time.time_ns()}-{os.getpid()}"
+        path = os.path.join(self.base_path, name)
+        store.save_local(path)
+        with open(os.path.join(path, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        pointer = os.path.join(self.base_path, POINTER_NAME)
+        tmp_pointer = f"{pointer}.{os.getpid()}.tmp"
+        with open(tmp_pointer, 'w', encoding='utf-8') as f:
+            f.write(name)
+        os.replace(tmp_pointer, pointer)
+        self._prune(keep=name)
+        return path
+
+    def _prune(self, keep):
+        versions = sorted(
+            (entry for entry in os.listdir(self.base_path)
+             if entry.startswith('v') and os.path.isdir(os.path.join(self.base_path, entry))),
+            reverse=True,
+        )
+        for entry in versions[KEEP_VERSIONS:]:
+            if entry != keep:
+                shutil.rmtree(os.path.join(self.base_path, entry), ignore_errors=True)
+
+
+def _manifest_from_docstore(store, documents):
+    """Rebuild a manifest for an index saved before manifests existed.
+
+    Stored documents are matched to current spots by the hash of their text,
+    so unchanged spots are kept without being embedded again.
+    """
+    by_hash = {doc_hash: key for key, (_, doc_hash) in documents.items()}
+    entries = {}
+    for docstore_id in store.index_to_docstore_id.values():
+        doc = store.docstore.search(docstore_id)
+        doc_hash = content_hash(getattr(doc, 'page_content', ''))
+        key = by_hash.get(doc_hash)
+        if key is not None and key not in entries:
+            entries[key] = {"hash": doc_hash, "doc_id": docstore_id}
+        else:
+            # Stale or duplicate document; schedule it for removal.
+            entries[f"orphan-{docstore_id}"] = {"hash": doc_hash, "doc_id": docstore_id}
+    return {"version": 1, "documents": entries}
+
+
+def sync_vector_store(data, embeddings, index_path=DEFAULT_INDEX_PATH):
+    """Load the FAISS index for `data`, embedding only spots that are new or changed.
+
+    Removed spots are deleted from the index. Any change is published as a
+    new index version; an up-to-date index is returned without writing.
+    """
+    documents = {}
+    for item in data or []:
+        text = spot_document_text(item)
+        documents[spot_key(item)] = (item, content_hash(text))
+
+    directory = IndexDirectory(index_path)
+    store, manifest = directory.load(embeddings)
+
+    if store is None:
+        if not documents:
+            return None
+        FAISS, _ = _require_langchain()
+        keys = list(documents)
+        store = FAISS.from_documents(
+            [make_document(documents[key][0]) for key in keys], embeddings, ids=keys
+        )
+        entries = {key: {"hash": documents[key][1], "doc_id": key} for key in keys}
+        directory.publish(store, {"version": 1, "documents": entries})
+        return store
+
+    derived = manifest is None
+    if derived:
+        manifest = _manifest_from_docstore(store, documents)
+    entries = manifest.get("documents", {})
+
+    stale_doc_ids = []
+    to_add = []
+    for key, entry in entries.items():
+        current = documents.get(key)
+        if current is None or current[1] != entry["hash"]:
+            stale_doc_ids.append(entry["doc_id"])
+    for key, (item, doc_hash) in documents.items():
+        entry = entries.get(key)
+        if entry is None or entry["hash"] != doc_hash:
+            to_add.append(key)
+
+    if not stale_doc_ids and not to_add and not derived:
+        return store
+
+    if stale_doc_ids:
+        store.delete(stale_doc_ids)
+    if to_add:
+        store.add_documents([make_document(documents[key][0]) for key in to_add], ids=to_add)
+
+    new_entries = {
+        key: entries[key] for key in documents if key not in to_add and key in entries
+    }
+    for key in to_add:
+        new_entries[key] = {"hash": documents[key][1], "doc_id": key}
+    directory.publish(store, {"version": 1, "documents": new_entries})
+    return store
+
+
+def make_document(item):
+    _, Document = _require_langchain()
+    return Document(page_content=spot_document_text(item), metadata={"name": item.get("name")})
+
+
+class VectorStoreHolder:
+    """Process-wide, thread-safe owner of the live vector store.
+
+    Sessions call `get()` whenever they need to search instead of keeping the
+    store in session_state, so a rebuilt index is hot-swapped for everyone at
+    once. `ensure()` rebuilds when the catalogue's `spots_digest` changes
+    (reviews are never embedded, so they don't count); with `wait=False` the
+    rebuild runs in the background while the previous store keeps serving.
+    """
+
+    def __init__(self, loader):
+        self.loader = loader
+        self._store = None
+        self._version = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._building = None
+
+    def get(self):
+        return self._store
+
+    @property
+    def version(self):
+        return self._version
+
+    def ensure(self, catalog, wait=True):
+        if self._version == catalog.spots_digest:
+            return self._store
+        if wait or self._store is None:
+            self._rebuild(catalog)
+        else:
+            self.warm(catalog)
+        return self._store
+
+    def warm(self, catalog):
+        """Start a background rebuild for `catalog` unless one is already running"""
+        with self._lock:
+            if self._building is not None and self._building.is_alive():
+                return self._building
+            thread = threading.Thread(
+                target=self._rebuild_quietly, args=(catalog,), name="vector-store-warmup", daemon=True
+            )
+            self._building = thread
+        thread.start()
+        return thread
+
+    def _rebuild(self, catalog):
+        with self._build_lock:
+            if self._version == catalog.spots_digest:
+                return
+            store = self.loader(catalog.spots)
+            with self._lock:
+                self._store = store
+                self._version = catalog.spots_digest
+
+    def _rebuild_quietly(self, catalog):
+        try:
+            self._rebuild(catalog)
+        except Exception:
+            print(traceback.format_exc())
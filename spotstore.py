@@ -0,0 +1,390 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlitedb import ThreadLocalConnection
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_JSON_PATH = os.path.join(BASE_DIR, 'tourist_spots.json')
+DEFAULT_DB_PATH = os.path.join(BASE_DIR, 'tourist_spots.db')
+RECENT_REVIEW_DAYS = 30
+REVIEW_STATS_SCHEMA = '1'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS spots (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    review_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    spot_id INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reviews_by_spot ON reviews (spot_id, review_id);
+CREATE TABLE IF NOT EXISTS review_stats (
+    spot_id INTEGER PRIMARY KEY,
+    review_count INTEGER NOT NULL,
+    latest_timestamp TEXT NOT NULL,
+    review_version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS review_daily (
+    spot_id INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    review_count INTEGER NOT NULL,
+    PRIMARY KEY (spot_id, day)
+);
+CREATE TABLE IF NOT EXISTS review_digests (
+    spot_id INTEGER PRIMARY KEY,
+    review_version INTEGER NOT NULL,
+    review_count INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    created TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SpotStore:
+    """SQLite (WAL) backed store for tourist spots and their user reviews.
+
+    The spot catalogue is imported from the JSON file the first time the
+    store is opened, and spot fields are refreshed whenever that file changes
+    on disk. Reviews live only in the database, so adding one is a single
+    INSERT instead of a rewrite of the whole catalogue.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, json_path=DEFAULT_JSON_PATH):
+        self.db_path = db_path
+        self.json_path = json_path
+        self._connect = ThreadLocalConnection(db_path)
+        self._connect().executescript(SCHEMA)
+        self._migrate_review_stats()
+        self._sync_from_json()
+
+    def _transaction(self):
+        return _Transaction(self._connect())
+
+    def _get_meta(self, conn, key, default=None):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, conn, key, value):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value)),
+        )
+
+    def _bump_version(self, conn, spots_changed=False):
+        version = int(self._get_meta(conn, 'version', 0)) + 1
+        self._set_meta(conn, 'version', version)
+        if spots_changed:
+            # Reviews only bump `version`; this one tracks the spot fields.
+            self._set_meta(conn, 'spots_version', version)
+        return version
+
+    def _migrate_review_stats(self):
+        """Build the review aggregates for databases created before they existed"""
+        with self._transaction() as conn:
+            if self._get_meta(conn, 'review_stats_schema') != REVIEW_STATS_SCHEMA:
+                self._rebuild_review_stats(conn)
+                self._set_meta(conn, 'review_stats_schema', REVIEW_STATS_SCHEMA)
+
+    def _rebuild_review_stats(self, conn):
+        conn.execute("DELETE FROM review_stats")
+        conn.execute("DELETE FROM review_daily")
+        conn.execute(
+            "INSERT INTO review_stats (spot_id, review_count, latest_timestamp, review_version) "
+            "SELECT spot_id, COUNT(*), MAX(timestamp), MAX(review_id) FROM reviews GROUP BY spot_id"
+        )
+        conn.execute(
+            "INSERT INTO review_daily (spot_id, day, review_count) "
+            "SELECT spot_id, substr(timestamp, 1, 10), COUNT(*) FROM reviews GROUP BY spot_id, substr(timestamp, 1, 10)"
+        )
+
+    def _record_review_stats(self, conn, spot_id, timestamp, review_id):
+        conn.execute(
+            "INSERT INTO review_stats (spot_id, review_count, latest_timestamp, review_version) VALUES (?, 1, ?, ?) "
+            "ON CONFLICT(spot_id) DO UPDATE SET review_count = review_count + 1, "
+            "latest_timestamp = max(latest_timestamp, excluded.latest_timestamp), "
+            "review_version = excluded.review_version",
+            (spot_id, timestamp, review_id),
+        )
+        conn.execute(
+            "INSERT INTO review_daily (spot_id, day, review_count) VALUES (?, ?, 1) "
+            "ON CONFLICT(spot_id, day) DO UPDATE SET review_count = review_count + 1",
+            (spot_id, timestamp[:10]),
+        )
+
+    def _json_mtime(self):
+        try:
+            return os.stat(self.json_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _sync_from_json(self):
+        """Import the JSON catalogue when it is new or has changed since the last import"""
+        mtime = self._json_mtime()
+        if mtime is None:
+            return
+        conn = self._connect()
+        if self._get_meta(conn, 'json_mtime') == str(mtime):
+            return
+        with open(self.json_path, 'r', encoding='utf-8') as f:
+            spots = json.load(f)
+        with self._transaction() as conn:
+            # Another process may have imported the same file while we were parsing it.
+            if self._get_meta(conn, 'json_mtime') == str(mtime):
+                return
+            first_import = self._get_meta(conn, 'json_mtime') is None
+            self._write_spots(conn, spots, include_reviews=first_import)
+            if first_import:
+                self._rebuild_review_stats(conn)
+            self._set_meta(conn, 'json_mtime', mtime)
+            self._bump_version(conn, spots_changed=True)
+
+    def _write_spots(self, conn, spots, include_reviews):
+        conn.execute("DELETE FROM spots")
+        for position, spot in enumerate(spots):
+            spot = dict(spot)
+            reviews = spot.pop('user_reviews', [])
+            conn.execute(
+                "INSERT INTO spots (id, position, data) VALUES (?, ?, ?)",
+                (spot.get('id'), position, json.dumps(spot, ensure_ascii=False)),
+            )
+            if include_reviews:
+                conn.execute("DELETE FROM reviews WHERE spot_id = ?", (spot.get('id'),))
+                conn.executemany(
+                    "INSERT INTO reviews (spot_id, content, timestamp) VALUES (?, ?, ?)",
+                    [(spot.get('id'), r.get('content', ''), r.get('timestamp', '')) for r in reviews],
+                )
+
+    def version(self):
+        """Monotonic counter bumped on every write; cheap to poll"""
+        self._sync_from_json()
+        return int(self._get_meta(self._connect(), 'version', 0))
+
+    def versions(self):
+        """(version, spots_version); the second only changes when spot fields do, not on reviews"""
+        self._sync_from_json()
+        values = dict(self._connect().execute(
+            "SELECT key, value FROM meta WHERE key IN ('version', 'spots_version')"
+        ).fetchall())
+        return int(values.get('version', 0)), int(values.get('spots_version', 0))
+
+    def load_spots(self, include_reviews=True):
+        """Return every spot in catalogue order, with its `user_reviews` attached unless include_reviews=False"""
+        self._sync_from_json()
+        conn = self._connect()
+        if not include_reviews:
+            rows = conn.execute("SELECT data FROM spots ORDER BY position").fetchall()
+            return [json.loads(data) for (data,) in rows]
+        # A read transaction gives a consistent snapshot of spots and reviews.
+        with _Transaction(conn, mode="DEFERRED"):
+            spot_rows = conn.execute("SELECT id, data FROM spots ORDER BY position").fetchall()
+            review_rows = conn.execute(
+                "SELECT spot_id, content, timestamp FROM reviews ORDER BY review_id"
+            ).fetchall()
+        reviews = {}
+        for spot_id, content, timestamp in review_rows:
+            reviews.setdefault(spot_id, []).append({"content": content, "timestamp": timestamp})
+        spots = []
+        for spot_id, data in spot_rows:
+            spot = json.loads(data)
+            spot['user_reviews'] = reviews.get(spot_id, [])
+            spots.append(spot)
+        return spots
+
+    def save_spots(self, spots):
+        """Replace the whole catalogue, reviews included"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM reviews")
+            self._write_spots(conn, spots, include_reviews=True)
+            self._rebuild_review_stats(conn)
+            self._bump_version(conn, spots_changed=True)
+
+    def add_review(self, spot_id, content, timestamp=None):
+        """Append a review to a spot. Returns False when the spot does not exist."""
+        timestamp = timestamp or time.strftime("%Y-%m-%d %H:%M:%S")
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM spots WHERE id = ?", (spot_id,)).fetchone() is None:
+                return False
+            cursor = conn.execute(
+                "INSERT INTO reviews (spot_id, content, timestamp) VALUES (?, ?, ?)",
+                (spot_id, content, timestamp),
+            )
+            self._record_review_stats(conn, spot_id, timestamp, cursor.lastrowid)
+            self._bump_version(conn)
+        return True
+
+    def review_count(self, spot_id):
+        row = self._connect().execute(
+            "SELECT review_count FROM review_stats WHERE spot_id = ?", (spot_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def review_stats(self, recent_days=RECENT_REVIEW_DAYS):
+        """{spot_id: {'count', 'latest', 'recent', 'version'}} for every spot with reviews.
+
+        `recent` is the number of reviews in the last `recent_days` days and
+        `version` changes whenever the spot's set of reviews does.
+        """
+        since = (date.today() - timedelta(days=recent_days)).isoformat()
+        conn = self._connect()
+        with _Transaction(conn, mode="DEFERRED"):
+            rows = conn.execute(
+                "SELECT spot_id, review_count, latest_timestamp, review_version FROM review_stats"
+            ).fetchall()
+            recent = dict(conn.execute(
+                "SELECT spot_id, SUM(review_count) FROM review_daily WHERE day >= ? GROUP BY spot_id", (since,)
+            ).fetchall())
+        return {
+            spot_id: {'count': count, 'latest': latest, 'recent': recent.get(spot_id, 0), 'version': version}
+            for spot_id, count, latest, version in rows
+        }
+
+    def recent_reviews(self, spot_id, limit=40):
+        """Review texts for a spot, newest first"""
+        rows = self._connect().execute(
+            "SELECT content FROM reviews WHERE spot_id = ? ORDER BY review_id DESC LIMIT ?", (spot_id, limit)
+        ).fetchall()
+        return [content for (content,) in rows]
+
+    def review_digests(self):
+        """{spot_id: (review_version, review_count, digest)} for every stored digest"""
+        rows = self._connect().execute(
+            "SELECT spot_id, review_version, review_count, digest FROM review_digests"
+        ).fetchall()
+        return {spot_id: (version, count, digest) for spot_id, version, count, digest in rows}
+
+    def save_review_digest(self, spot_id, review_version, review_count, digest):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO review_digests (spot_id, review_version, review_count, digest, created) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(spot_id) DO UPDATE SET "
+                "review_version = excluded.review_version, review_count = excluded.review_count, "
+                "digest = excluded.digest, created = excluded.created",
+                (spot_id, review_version, review_count, digest, time.strftime("%Y-%m-%d %H:%M:%S")),
+            )
+
+    def reviews_page(self, spot_id, offset=0, limit=5):
+        """One page of a spot's reviews, newest first"""
+        rows = self._connect().execute(
+            "SELECT content, timestamp FROM reviews WHERE spot_id = ? "
+            "ORDER BY review_id DESC LIMIT ? OFFSET ?",
+            (spot_id, limit, offset),
+        ).fetchall()
+        return [{"content": content, "timestamp": timestamp} for content, timestamp in rows]
+
+    def export_json(self, path=None):
+        """Write the catalogue in the original tourist_spots.json format"""
+        path = path or self.json_path
+        spots = self.load_spots()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(spots, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        if os.path.abspath(path) == os.path.abspath(self.json_path):
+            # The export already matches the store; don't re-import it as an edit.
+            with self._transaction() as conn:
+                self._set_meta(conn, 'json_mtime', self._json_mtime())
+        return path
+
+
+class _Transaction:
+    def __init__(self, conn, mode="IMMEDIATE"):
+        self.conn = conn
+        self.mode = mode
+
+    def __enter__(self):
+        self.conn.execute(f"BEGIN {self.mode}")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+EMPTY_REVIEW_STATS = {'count': 0, 'latest': None, 'recent': 0, 'version': 0}
+
+
+class SpotCatalog:
+    """Immutable snapshot of the catalogue with prebuilt lookups.
+
+    Spots carry no `user_reviews`; per-spot review counts come from
+    `stats_for()` and the reviews themselves from SpotStore.reviews_page.
+    Snapshots are shared across sessions, so callers must treat the spot
+    dicts as read-only.
+    """
+
+    def __init__(self, spots, version, review_stats=None, spots_version=None):
+        self.spots = spots
+        self.version = version
+        self.spots_version = spots_version
+        self.review_stats = review_stats or {}
+        self.by_id = {spot.get('id'): spot for spot in spots}
+        self.by_category = {}
+        for spot in spots:
+            self.by_category.setdefault(spot.get('category'), []).append(spot)
+        self.categories = sorted(c for c in self.by_category if c is not None)
+        # Changes only when spot fields change, not when a review is added.
+        self.spots_digest = hashlib.sha1(json.dumps(
+            [{k: v for k, v in spot.items() if k != 'user_reviews'} for spot in spots],
+            sort_keys=True, ensure_ascii=False,
+        ).encode('utf-8')).hexdigest()
+
+    def with_review_stats(self, review_stats, version):
+        """The same spots, lookups and digest with fresher review aggregates"""
+        catalog = copy.copy(self)
+        catalog.review_stats = review_stats or {}
+        catalog.version = version
+        return catalog
+
+    def get(self, spot_id):
+        return self.by_id.get(spot_id)
+
+    def stats_for(self, spot_id):
+        return self.review_stats.get(spot_id, EMPTY_REVIEW_STATS)
+
+    def in_category(self, category):
+        if category in (None, 'All'):
+            return self.spots
+        return self.by_category.get(category, [])
+
+
+class SpotRepository:
+    """Process-wide view of a SpotStore that only reparses when the store changes"""
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._catalog = None
+
+    def snapshot(self):
+        version, spots_version = self.store.versions()
+        catalog = self._catalog
+        if catalog is not None and catalog.version == version:
+            return catalog
+        with self._lock:
+            catalog = self._catalog
+            if catalog is not None and catalog.version != version and catalog.spots_version == spots_version:
+                # Only reviews changed: keep the parsed spots and refresh the aggregates.
+                self._catalog = catalog.with_review_stats(self.store.review_stats(), version)
+            elif catalog is None or catalog.version != version:
+                # A write landing between versions() and load_spots() only costs one extra reload.
+                # Reviews stay in the store (reviews_page / review_stats); the snapshot holds spot fields only.
+                spots = self.store.load_spots(include_reviews=False)
+                self._catalog = SpotCatalog(spots, version, self.store.review_stats(), spots_version)
+            return self._catalog
+
+    def add_review(self, spot_id, content, timestamp=None):
+        return self.store.add_review(spot_id, content, timestamp)
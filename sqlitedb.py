@@ -0,0 +1,24 @@
+import sqlite3
+import threading
+
+
+class ThreadLocalConnection:
+    """Callable returning this thread's connection to a SQLite database in WAL mode.
+
+    sqlite3 connections can't be shared between threads, so each thread
+    opens its own on first use and keeps it.
+    """
+
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def __call__(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_PATH = os.path.join(BASE_DIR, 'tourist_spots.json')
+
+# Rough bounding box of Iki Island.
+LAT_RANGE = (33.72, 33.86)
+LON_RANGE = (129.65, 129.79)
+NAME_PREFIXES = ['North', 'South', 'East', 'West', 'Upper', 'Lower', 'Old', 'New', 'Little', 'Great']
+NAME_PLACES = ['Katsumoto', 'Ashibe', 'Gonoura', 'Ishida', 'Yunomoto', 'Mushozu', 'Hatsuyama', 'Tobu',
+               'Kiyoishi', 'Sugo', 'Moroyoshi', 'Watara', 'Ondake', 'Hachiman', 'Kurosaki']
+DURATIONS = ['30-60 minutes', '1-1.5 hours', '1-2 hours', '1.5-3 hours', '2-3 hours', '2-4 hours', 'Half day']
+BEST_TIMES = ['Year-round', 'April-November', 'June-September', 'March-May, September-November',
+              'December-February', 'July-August', 'Year-round (sunset ideal)']
+REVIEW_PHRASES = ['Beautiful views', 'Very cool place, I recommend', 'A bit hard to reach by bus',
+                  'Quiet and peaceful', 'Crowded at weekends', 'Worth the detour', 'Great for photos',
+                  'Bring water, there is no shop nearby', 'The staff were very kind', 'Lovely at sunset']
+REVIEW_WINDOW_DAYS = 730
+UNREVIEWED_SHARE = 0.2
+
+
+def load_templates(path=TEMPLATE_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def review_count(rng, mean):
+    """Heavy-tailed review count: most spots get a few, a handful get hundreds"""
+    if mean <= 0 or rng.random() < UNREVIEWED_SHARE:
+        return 0
+    # A Pareto variate with shape 1.5 averages 3.
+    scale = mean / (3 * (1 - UNREVIEWED_SHARE))
+    return min(int(rng.paretovariate(1.5) * scale), int(100 * mean))
+
+def generate_reviews(rng, count, now):
+    reviews = []
+    for _ in range(count):
+        when = now - timedelta(seconds=rng.randrange(REVIEW_WINDOW_DAYS * 86400))
+        reviews.append({"content": rng.choice(REVIEW_PHRASES), "timestamp": when.strftime("%Y-%m-%d %H:%M:%S")})
+    reviews.sort(key=lambda r: r['timestamp'])
+    return reviews
+
+def generate_spots(count, seed=0, mean_reviews=4, templates=None, now=None):
+    """`count` spots in the tourist_spots.json schema, varied from the real ones.
+
+    The same seed always yields the same data, so benchmark runs on
+    different commits see identical inputs.
+    """
+    rng = random.Random(seed)
+    templates = templates or load_templates()
+    now = now or datetime(2026, 1, 1)
+    spots = []
+    for i in range(count):
+        template = templates[i % len(templates)]
+        place = f"{rng.choice(NAME_PREFIXES)} {rng.choice(NAME_PLACES)}"
+        spot = dict(template)
+        spot.update({
+            "id": i + 1,
+            "name": f"{place} {template['name']} {i + 1}",
+            "shortDescription": f"{template['shortDescription']} Near {place}.",
+            "distance": f"{rng.randint(1, 25)} km from port",
+            "bestTime": rng.choice(BEST_TIMES),
+            "duration": rng.choice(DURATIONS),
+            "highlights": rng.sample(template['highlights'], len(template['highlights'])),
+            "coordinates": [round(rng.uniform(*LAT_RANGE), 5), round(rng.uniform(*LON_RANGE), 5)],
+            "user_reviews": generate_reviews(rng, review_count(rng, mean_reviews), now),
+        })
+        spots.append(spot)
+    return spots
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic tourist_spots.json of any size")
+    parser.add_argument('count', type=int, help="number of spots, e.g. 1000, 10000 or 100000")
+    parser.add_argument('-o', '--output', help="output path (default: synthetic_spots_<count>.json)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mean-reviews', type=float, default=4)
+    args = parser.parse_args(argv)
+    spots = generate_spots(args.count, seed=args.seed, mean_reviews=args.mean_reviews)
+    output = args.output or f"synthetic_spots_{args.count}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(spots, f, ensure_ascii=False)
+    reviews = sum(len(s['user_reviews']) for s in spots)
+    print(f"Wrote {len(spots)} spots with {reviews} reviews to {output}")
+
+
+if __name__ == "__main__":
+    main()
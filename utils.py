@@ -1,7 +1,8 @@
 import streamlit as st
 import base64
-import random
 import os
+import images
+from ratings import RatingsLog, RatingsStore
 
 def load_css(file_name):
     with open(file_name) as f:
@@ -18,14 +19,19 @@ def get_base64_of_bin_file(bin_file):
 def set_bg_hack(main_bg):
     '''
     A function to unpack an image from root folder and set as bg.
-    The bg will be static and strictly lower than other objects
+    The bg will be static and strictly lower than other objects.
+    Uses the cached hero derivative when static serving is available,
+    falling back to inlining the original as base64.
     '''
-    bin_str = get_base64_of_bin_file(main_bg)
-    if bin_str:
+    bg_url = images.image_url(main_bg, 'hero')
+    if bg_url is None:
+        bin_str = get_base64_of_bin_file(main_bg)
+        bg_url = f"data:image/png;base64,{bin_str}" if bin_str else None
+    if bg_url:
         page_bg_img = f'''
         <style>
         .stApp {{
-            background-image: url("data:image/png;base64,{bin_str}");
+            background-image: url("{bg_url}");
             background-size: cover;
             background-attachment: fixed;
         }}
@@ -83,14 +89,34 @@ COMMENTS = [
 
 USERS = ["SakuraTraveler", "NatureLover99", "TokyoDrifter", "RuralEscapist", "OnsenHunter"]
 
+# Generated demo ratings mixed into the About statistics; off unless asked for.
+SYNTHETIC_RATINGS = int(os.getenv("IKI_SYNTHETIC_RATINGS", 0))
+
+def new_ratings_store():
+    return RatingsStore(locations=LOCATIONS, users=USERS, comments=COMMENTS)
+
 def generate_ratings(num=5):
-    ratings = []
-    for _ in range(num):
-        ratings.append({
-            "user": random.choice(USERS),
-            "location": random.choice(list(LOCATIONS.keys())),
-            "score": random.randint(3, 5),
-            "comment": random.choice(COMMENTS),
-            "date": f"2025-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}"
-        })
-    return ratings
+    return new_ratings_store().generate(num, start='2025-01-01', end='2026-01-01').records()
+
+@st.cache_resource
+def get_ratings_log():
+    return RatingsLog()
+
+@st.cache_resource
+def get_ratings_store():
+    '''
+    Process-wide ratings store: every rating submitted through the app (from
+    the ratings log), plus IKI_SYNTHETIC_RATINGS generated demo ratings when
+    that is set. Rollups are maintained on insert, so the About section's
+    statistics don't depend on how many ratings there are.
+    '''
+    store = new_ratings_store()
+    if SYNTHETIC_RATINGS:
+        store.generate(SYNTHETIC_RATINGS, seed=0)
+    return store.add_records(get_ratings_log().records())
+
+def submit_rating(user, location, score, comment=''):
+    """Persist a rating and add it to the live statistics"""
+    record = get_ratings_log().add(user, location, score, comment)
+    get_ratings_store().add_records([record])
+    return record